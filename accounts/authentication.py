@@ -0,0 +1,129 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+# How long a revocation read from the database is trusted, bounding the delay of changes made without signals,
+# e.g. a queryset update of is_active.
+TOKENS_REVOKED_AT_CACHE_TIMEOUT = 5 * 60
+
+
+def revoked_tokens_cache_key(user_id):
+    return f'accounts:user:{user_id}:tokens_revoked_at'
+
+
+def revoke_user_tokens(user_id):
+    """Reject every token issued to the user until now, recorded on the user and cached in front of it."""
+    from accounts.models import CustomUser
+
+    revoked_at = timezone.now()
+    CustomUser.objects.filter(pk=user_id).update(tokens_valid_after=revoked_at)
+    cache.set(revoked_tokens_cache_key(user_id), int(revoked_at.timestamp()), TOKENS_REVOKED_AT_CACHE_TIMEOUT)
+
+
+def forget_tokens_revocation(user_id):
+    """Drop the cached revocation of the user, read again from the database on next use."""
+    cache.delete(revoked_tokens_cache_key(user_id))
+
+
+def get_tokens_revoked_at(user_id):
+    """
+    Return the timestamp up to which the tokens of the user are revoked, infinite for inactive or deleted users,
+    reading the database through the cache.
+    """
+    from accounts.models import CustomUser
+
+    key = revoked_tokens_cache_key(user_id)
+    revoked_at = cache.get(key)
+    if revoked_at is None:
+        user = CustomUser.objects.filter(pk=user_id).values_list('is_active', 'tokens_valid_after').first()
+        if user is None or not user[0]:
+            revoked_at = math.inf
+        else:
+            revoked_at = int(user[1].timestamp()) if user[1] else 0
+        cache.set(key, revoked_at, TOKENS_REVOKED_AT_CACHE_TIMEOUT)
+    return revoked_at
+
+
+def is_token_revoked(token):
+    # ``iat`` has a one second resolution: a token issued in the second of the revocation may predate it.
+    user_id = token.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+    return token.get('iat', 0) <= get_tokens_revoked_at(user_id)
+
+
+def claims_expired_cache_key(user_id):
+    return f'accounts:user:{user_id}:claims_expired_at'
+
+
+def expire_user_claims(user_id):
+    """
+    Stop trusting the claims of the tokens issued to the user until now, after a change of their groups, email or
+    staff record. The tokens stay valid: the user is loaded from the database until they refresh them.
+    """
+    from accounts.models import CustomUser
+
+    expired_at = timezone.now()
+    CustomUser.objects.filter(pk=user_id).update(claims_valid_after=expired_at)
+    cache.set(claims_expired_cache_key(user_id), int(expired_at.timestamp()), TOKENS_REVOKED_AT_CACHE_TIMEOUT)
+
+
+def get_claims_expired_at(user_id):
+    """Return the timestamp up to which the token claims of the user are stale, read through the cache."""
+    from accounts.models import CustomUser
+
+    key = claims_expired_cache_key(user_id)
+    expired_at = cache.get(key)
+    if expired_at is None:
+        claims_valid_after = CustomUser.objects.filter(pk=user_id).values_list('claims_valid_after', flat=True).first()
+        expired_at = int(claims_valid_after.timestamp()) if claims_valid_after else 0
+        cache.set(key, expired_at, TOKENS_REVOKED_AT_CACHE_TIMEOUT)
+    return expired_at
+
+
+def are_claims_stale(token):
+    user_id = token.get(settings.SIMPLE_JWT.get('USER_ID_CLAIM', 'user_id'))
+    return token.get('iat', 0) <= get_claims_expired_at(user_id)
+
+
+class ClaimsUser(TokenUser):
+    """A user built from the token claims, see MissionsTokenObtainPairSerializer, without touching the database."""
+
+    @cached_property
+    def _group_names(self):
+        return frozenset(self.token.get('groups', ()))
+
+    @property
+    def email(self):
+        return self.token.get('email', '')
+
+    @property
+    def staff_id(self):
+        return self.token.get('staff_id')
+
+    def __str__(self):
+        return self.email
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that serves safe requests with a ClaimsUser instead of loading the user, other requests
+    and tokens whose claims expire_user_claims() made stale still get the database user. Tokens revoked with
+    revoke_user_tokens() are rejected either way.
+    """
+
+    def authenticate(self, request):
+        self.safe_request = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if is_token_revoked(validated_token):
+            raise AuthenticationFailed('Token has been revoked.', code='token_revoked')
+        if self.safe_request and 'groups' in validated_token and not are_claims_stale(validated_token):
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
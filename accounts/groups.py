@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.db import transaction
+
+GROUP_NAMES_CACHE_TIMEOUT = 60 * 15
+
+
+def group_names_cache_key(user_id):
+    return f'accounts:user:{user_id}:group_names'
+
+
+def load_group_names(user_id):
+    """Return the group names of a user, going through the shared cache."""
+    key = group_names_cache_key(user_id)
+    group_names = cache.get(key)
+    if group_names is None:
+        from django.contrib.auth.models import Group
+        group_names = frozenset(Group.objects.filter(user__id=user_id).values_list('name', flat=True))
+        cache.set(key, group_names, GROUP_NAMES_CACHE_TIMEOUT)
+    return group_names
+
+
+def load_group_names_many(user_ids):
+    """Return a mapping of user id to group names, querying the database once for all cache misses."""
+    keys = {group_names_cache_key(user_id): user_id for user_id in set(user_ids)}
+    group_names = {keys[key]: names for key, names in cache.get_many(keys).items()}
+    missing = [user_id for user_id in keys.values() if user_id not in group_names]
+    if missing:
+        from django.contrib.auth.models import Group
+        loaded = {user_id: set() for user_id in missing}
+        for user_id, name in Group.objects.filter(user__id__in=missing).values_list('user__id', 'name'):
+            loaded[user_id].add(name)
+        loaded = {user_id: frozenset(names) for user_id, names in loaded.items()}
+        cache.set_many({group_names_cache_key(user_id): names for user_id, names in loaded.items()},
+                       GROUP_NAMES_CACHE_TIMEOUT)
+        group_names.update(loaded)
+    return group_names
+
+
+def get_group_names(user):
+    """
+    Return the group names of ``user`` as a frozenset.
+
+    The result is memoized on the user instance, so every permission check made while serving
+    a request shares a single lookup.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    group_names = getattr(user, '_group_names', None)
+    if group_names is None:
+        group_names = load_group_names(user.pk)
+        user._group_names = group_names
+    return group_names
+
+
+def in_groups(user, *names):
+    return not get_group_names(user).isdisjoint(names)
+
+
+def invalidate_group_names(*user_ids):
+    """
+    Forget the cached group names of the users once the change commits: deleted any earlier, a concurrent request
+    could cache them again from the rows not committed yet.
+    """
+    keys = [group_names_cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,205 @@
+import bisect
+import ipaddress
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, please try again in a moment.'
+    default_code = 'login_busy'
+
+
+class LoginMetrics:
+    """
+    Counters and a latency histogram of password verifications, kept in the shared cache so that every worker process
+    adds to the same figures. Only ``in_flight`` is per process, reported along with the process id.
+    """
+
+    key_prefix = 'accounts:login:metrics'
+    counter_names = ('succeeded', 'failed', 'rejected_busy', 'throttled', 'upgraded_hashes')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+
+    def key(self, name):
+        return f'{self.key_prefix}:{name}'
+
+    @property
+    def bucket_names(self):
+        return [f'le_{bound}' for bound in LATENCY_BUCKETS] + ['le_inf']
+
+    @property
+    def keys(self):
+        return [self.key(name) for name in (*self.counter_names, *self.bucket_names, 'latency_sum_ms')]
+
+    def reset(self):
+        cache.delete_many(self.keys)
+        with self.lock:
+            self.in_flight = 0
+
+    def add(self, name, delta=1):
+        key = self.key(name)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Evicted in between, start over.
+            cache.set(key, delta, None)
+
+    def increment(self, counter):
+        self.add(counter)
+
+    def observe_latency(self, seconds):
+        self.add(self.bucket_names[bisect.bisect_left(LATENCY_BUCKETS, seconds)])
+        self.add('latency_sum_ms', round(seconds * 1000))
+
+    def snapshot(self):
+        values = cache.get_many(self.keys)
+        counters = {name: values.get(self.key(name), 0) for name in self.counter_names}
+        buckets = {name: values.get(self.key(name), 0) for name in self.bucket_names}
+        count = sum(buckets.values())
+        with self.lock:
+            in_flight = self.in_flight
+        return {
+            **counters,
+            'process': {'pid': os.getpid(), 'in_flight': in_flight},
+            'verification_latency': {
+                'count': count,
+                'average': values.get(self.key('latency_sum_ms'), 0) / 1000 / count if count else None,
+                'buckets': buckets,
+            },
+        }
+
+
+def verify(password, encoded):
+    """Check ``password`` against ``encoded``, telling whether the hash should be upgraded to the preferred hasher."""
+    if encoded is None:
+        # Unknown account: hash anyway, so response times do not reveal which emails exist.
+        make_password(password)
+        return False, False
+    is_correct = check_password(password, encoded)
+    must_update = False
+    if is_correct:
+        try:
+            hasher = identify_hasher(encoded)
+        except ValueError:
+            return is_correct, False
+        preferred = get_hasher('default')
+        must_update = hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+    return is_correct, must_update
+
+
+class PasswordVerifier:
+    """
+    Run password hash verifications on a bounded pool of threads, the hashing releasing the GIL.
+
+    At most ``workers + max_pending`` verifications are accepted at once; further logins fail fast with LoginBusy
+    instead of queueing behind the others and holding up the worker serving them.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-verifier')
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+        self.timeout = timeout
+
+    def verify(self, password, encoded):
+        if not self.slots.acquire(blocking=False):
+            login_metrics.increment('rejected_busy')
+            raise LoginBusy()
+        with login_metrics.lock:
+            login_metrics.in_flight += 1
+        started = time.monotonic()
+        try:
+            return self.executor.submit(verify, password, encoded).result(timeout=self.timeout)
+        except TimeoutError:
+            login_metrics.increment('rejected_busy')
+            raise LoginBusy()
+        finally:
+            login_metrics.observe_latency(time.monotonic() - started)
+            with login_metrics.lock:
+                login_metrics.in_flight -= 1
+            self.slots.release()
+
+
+login_metrics = LoginMetrics()
+password_verifier = PasswordVerifier(
+    workers=getattr(settings, 'LOGIN_VERIFIER_WORKERS', 4),
+    max_pending=getattr(settings, 'LOGIN_VERIFIER_MAX_PENDING', 16),
+    timeout=getattr(settings, 'LOGIN_VERIFIER_TIMEOUT', 10),
+)
+
+
+def hit_rate_limit(scope, ident):
+    """Count an attempt in the current window of ``scope``, raising Throttled once it is over the limit."""
+    limit, window = settings.LOGIN_RATE_LIMITS[scope]
+    window_start = int(time.time()) // window * window
+    key = f'accounts:login:{scope}:{ident}:{window_start}'
+    cache.add(key, 0, window)
+    try:
+        attempts = cache.incr(key)
+    except ValueError:
+        # Evicted in between, start over.
+        cache.set(key, 1, window)
+        attempts = 1
+    if attempts > limit:
+        login_metrics.increment('throttled')
+        raise Throttled(wait=window_start + window - time.time())
+
+
+def is_trusted_proxy(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.TRUSTED_PROXIES)
+
+
+def client_ip(request):
+    """
+    Return the address of the client. Behind TRUSTED_PROXIES, that is the last X-Forwarded-For address not added by
+    one of them, earlier ones being whatever the client claimed.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR')
+    if not is_trusted_proxy(remote_addr):
+        return remote_addr
+    for address in reversed(request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')):
+        address = address.strip()
+        if address and not is_trusted_proxy(address):
+            return address
+    return remote_addr
+
+
+def authenticate(request, email, password):
+    """Return the user whose credentials these are, or None, under the rate limits and the verifier pool."""
+    from accounts.models import CustomUser
+
+    hit_rate_limit('ip', client_ip(request) if request else None)
+    hit_rate_limit('account', email.lower())
+    try:
+        user = CustomUser._default_manager.get_by_natural_key(email)
+    except CustomUser.DoesNotExist:
+        user = None
+
+    is_correct, must_update = password_verifier.verify(password, user.password if user else None)
+    if not is_correct:
+        login_metrics.increment('failed')
+        return None
+    login_metrics.increment('succeeded')
+    if must_update:
+        # Not user.save(): upgrading the hash is not a password change and must not revoke the user's tokens.
+        user.set_password(password)
+        CustomUser._default_manager.filter(pk=user.pk).update(password=user.password)
+        login_metrics.increment('upgraded_hashes')
+    return user
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_customuser_tokens_valid_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='claims_valid_after',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_customuser_claims_valid_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,8 +1,13 @@
-from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin, Group
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
+from accounts.authentication import revoke_user_tokens, forget_tokens_revocation, expire_user_claims
+from accounts.groups import invalidate_group_names
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password, **extra_fields):
@@ -33,6 +38,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=timezone.now)
+    # Also bumped when the groups or permissions change, for the ETags of the payloads rendering the user.
+    modified = models.DateTimeField(auto_now=True)
+    # Tokens issued up to then are rejected, see accounts.authentication.
+    tokens_valid_after = models.DateTimeField(null=True, blank=True, editable=False)
+    # The claims of tokens issued up to then are no longer trusted, see accounts.authentication.
+    claims_valid_after = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'user'
@@ -43,6 +54,24 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_credentials = (instance.__dict__.get('password'), instance.__dict__.get('is_active'))
+        instance._loaded_claims = instance.get_claims()
+        return instance
+
+    def get_claims(self):
+        """The fields embedded in the tokens of the user, see MissionsTokenObtainPairSerializer."""
+        return self.__dict__.get('email'), self.__dict__.get('is_staff'), self.__dict__.get('is_superuser')
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'modified' not in update_fields:
+            # e.g. the last_login updates.
+            kwargs['update_fields'] = [*update_fields, 'modified']
+        super().save(*args, **kwargs)
+
     def clean(self):
         domain = self.email.split('@')[-1]
         if domain != 'ur.ac.rw':
@@ -51,3 +80,83 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+
+class RevokedToken(models.Model):
+    """Refresh tokens that can no longer be used, kept until they expire, see accounts.tokens."""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+def touch_users(user_ids):
+    CustomUser.objects.filter(pk__in=user_ids).update(modified=timezone.now())
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def invalidate_user_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == 'pre_clear':
+        user_ids = list(instance.user_set.values_list('pk', flat=True))
+    else:
+        user_ids = pk_set
+    invalidate_group_names(*user_ids)
+    touch_users(user_ids)
+    # The groups are embedded in the tokens of these users.
+    for user_id in user_ids:
+        expire_user_claims(user_id)
+
+
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def touch_users_on_permissions_change(sender, instance, action, reverse, pk_set, model, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, CustomUser):
+        user_ids = [instance.pk]
+    elif isinstance(instance, Group):
+        user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'pre_clear':
+        # A permission cleared from every user and group.
+        user_ids = CustomUser.objects.filter(
+            models.Q(user_permissions=instance) | models.Q(groups__permissions=instance)).values('pk')
+    elif model is CustomUser:
+        user_ids = pk_set
+    else:
+        user_ids = CustomUser.objects.filter(groups__in=pk_set).values('pk')
+    touch_users(user_ids)
+
+
+@receiver(post_save, sender=CustomUser)
+def revoke_tokens_on_credentials_change(sender, instance, created, **kwargs):
+    loaded_credentials = getattr(instance, '_loaded_credentials', None)
+    if loaded_credentials is None:
+        return
+    loaded_password, loaded_is_active = loaded_credentials
+    if instance.password != loaded_password or (loaded_is_active and not instance.is_active):
+        revoke_user_tokens(instance.pk)
+    elif instance.is_active and not loaded_is_active:
+        # Reactivated: the cache still holds the user as inactive.
+        forget_tokens_revocation(instance.pk)
+    instance._loaded_credentials = (instance.password, instance.is_active)
+    claims = instance.get_claims()
+    if claims != getattr(instance, '_loaded_claims', claims):
+        expire_user_claims(instance.pk)
+    instance._loaded_claims = claims
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_members(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return
+    user_ids = list(instance.user_set.values_list('pk', flat=True))
+    invalidate_group_names(*user_ids)
+    touch_users(user_ids)
+    for user_id in user_ids:
+        expire_user_claims(user_id)
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import update_last_login
+from rest_framework import exceptions
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.groups import get_group_names
+from accounts.login import authenticate
+from accounts.tokens import RotatingRefreshToken
+
+
+class MissionsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Embed what the API needs to serve reads without loading the user, see StatelessJWTAuthentication."""
+    token_class = RotatingRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        from core.models import Staff
+
+        token = super().get_token(user)
+        token['email'] = user.email
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token['groups'] = sorted(get_group_names(user))
+        token['staff_id'] = Staff.objects.filter(user=user).values_list('id', flat=True).first()
+        return token
+
+    def validate(self, attrs):
+        # Same as TokenObtainPairSerializer.validate(), verifying the password through accounts.login.
+        self.user = authenticate(self.context.get('request'), attrs[self.username_field], attrs['password'])
+        if not api_settings.USER_AUTHENTICATION_RULE(self.user):
+            raise exceptions.AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        refresh = self.get_token(self.user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh for active users only, with claims rebuilt from the database rather than copied from the old token,
+    so each rotation picks up group and staff changes.
+    """
+    token_class = RotatingRefreshToken
+
+    def validate(self, attrs):
+        from accounts.models import CustomUser
+
+        refresh = self.token_class(attrs['refresh'])
+        user = CustomUser._default_manager.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise TokenError('User is inactive or no longer exists')
+        user._group_names = frozenset(user.groups.values_list('name', flat=True))
+        new_refresh = MissionsTokenObtainPairSerializer.get_token(user)
+        data = {'access': str(new_refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            data['refresh'] = str(new_refresh)
+        return data
@@ -1,3 +1,176 @@
-from django.test import TestCase
+import io
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from accounts.authentication import is_token_revoked
+from accounts.groups import load_group_names
+from accounts.login import LoginMetrics, client_ip
+from accounts.models import CustomUser
+from accounts.serializers import MissionsTokenObtainPairSerializer
+
+PASSWORD = 'Missions@2024'
+
+
+class TokenTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups_and_permissions', stdout=io.StringIO())
+        cls.user = CustomUser.objects.create_user('admin@ur.ac.rw', PASSWORD)
+        cls.user.groups.add(Group.objects.get(name='Admin'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def obtain_tokens(self):
+        response = self.client.post('/api/token/', {'email': self.user.email, 'password': PASSWORD}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_users(self, access):
+        return self.client.get('/api/users/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+
+class TokenRevocationTests(TokenTestCase):
+    def test_deactivated_user_is_rejected_after_a_cache_reset(self):
+        tokens = self.obtain_tokens()
+        self.assertEqual(self.get_users(tokens['access']).status_code, 200)
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        cache.clear()
+        self.assertEqual(self.get_users(tokens['access']).status_code, 401)
+
+    def test_inactive_user_is_rejected_without_any_signal(self):
+        tokens = self.obtain_tokens()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        self.assertEqual(self.get_users(tokens['access']).status_code, 401)
+
+    def test_stale_group_claims_fall_back_to_the_database(self):
+        tokens = self.obtain_tokens()
+        self.assertEqual(self.get_users(tokens['access']).status_code, 200)
+        self.user.groups.remove(Group.objects.get(name='Admin'))
+        cache.clear()
+        # Still authenticated, but with the groups read from the database rather than from the token.
+        self.assertEqual(self.get_users(tokens['access']).status_code, 403)
+
+    def test_token_issued_in_the_second_of_the_revocation_is_rejected(self):
+        token = MissionsTokenObtainPairSerializer.get_token(self.user).access_token
+        issued_at = datetime.fromtimestamp(token['iat'], tz=dt_timezone.utc)
+        CustomUser.objects.filter(pk=self.user.pk).update(tokens_valid_after=issued_at + timedelta(milliseconds=500))
+        self.assertTrue(is_token_revoked(token))
+        cache.clear()
+        CustomUser.objects.filter(pk=self.user.pk).update(tokens_valid_after=issued_at - timedelta(seconds=1))
+        self.assertFalse(is_token_revoked(token))
+
+
+class TokenRefreshTests(TokenTestCase):
+    def refresh(self, refresh):
+        return self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+
+    def test_refresh_rotates_the_refresh_token(self):
+        tokens = self.obtain_tokens()
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], tokens['refresh'])
+        self.assertEqual(self.get_users(response.data['access']).status_code, 200)
+        # The rotated token is denied, so a stolen copy cannot be replayed.
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+
+    def test_deactivated_user_cannot_refresh_after_a_cache_reset(self):
+        tokens = self.obtain_tokens()
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        cache.clear()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_inactive_user_cannot_refresh_even_unrevoked(self):
+        tokens = self.obtain_tokens()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_refresh_rebuilds_the_claims(self):
+        tokens = self.obtain_tokens()
+        Group.objects.get(name='Admin').user_set.remove(self.user)
+        cache.clear()
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_users(response.data['access']).status_code, 403)
+
+    def test_group_change_does_not_revoke_the_tokens(self):
+        tokens = self.obtain_tokens()
+        self.user.groups.add(Group.objects.get(name='Staff'))
+        self.assertFalse(is_token_revoked(RefreshToken(tokens['refresh'])))
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data['access'])['groups'], ['Admin', 'Staff'])
+
+
+class GroupNamesTests(TokenTestCase):
+    def test_group_names_are_invalidated_on_commit(self):
+        self.assertEqual(load_group_names(self.user.pk), {'Admin'})
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.groups.add(Group.objects.get(name='Staff'))
+            # Until the change commits, other requests still read the committed groups.
+            self.assertEqual(load_group_names(self.user.pk), {'Admin'})
+        for callback in callbacks:
+            callback()
+        self.assertEqual(load_group_names(self.user.pk), {'Admin', 'Staff'})
+
+
+class LoginMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_processes_share_the_counters(self):
+        # Two instances stand for two worker processes sharing the cache.
+        worker, other_worker = LoginMetrics(), LoginMetrics()
+        worker.increment('succeeded')
+        worker.observe_latency(0.2)
+        other_worker.increment('succeeded')
+        other_worker.increment('failed')
+        other_worker.observe_latency(3)
+
+        snapshot = other_worker.snapshot()
+        self.assertEqual((snapshot['succeeded'], snapshot['failed']), (2, 1))
+        latency = snapshot['verification_latency']
+        self.assertEqual((latency['count'], latency['average']), (2, 1.6))
+        self.assertEqual((latency['buckets']['le_0.25'], latency['buckets']['le_5']), (1, 1))
+
+    def test_admin_reads_the_metrics(self):
+        admin = CustomUser.objects.create_superuser('admin@ur.ac.rw', 'Missions@2024')
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get('/api/token/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pid', response.data['process'])
+
+
+@override_settings(TRUSTED_PROXIES=['172.16.0.0/12'])
+class ClientIPTests(TestCase):
+    def request(self, remote_addr, forwarded_for=None):
+        headers = {'HTTP_X_FORWARDED_FOR': forwarded_for} if forwarded_for else {}
+        return RequestFactory().post('/api/token/', REMOTE_ADDR=remote_addr, **headers)
+
+    def test_direct_client(self):
+        self.assertEqual(client_ip(self.request('41.186.1.2', '10.0.0.1')), '41.186.1.2')
+
+    def test_client_behind_trusted_proxy(self):
+        self.assertEqual(client_ip(self.request('172.18.0.5', '41.186.1.2')), '41.186.1.2')
+
+    def test_spoofed_addresses_are_ignored(self):
+        # Only the address appended by the proxy is trusted, not what the client sent before it.
+        self.assertEqual(client_ip(self.request('172.18.0.5', '1.2.3.4, 41.186.1.2')), '41.186.1.2')
+
+    def test_proxy_without_header(self):
+        self.assertEqual(client_ip(self.request('172.18.0.5')), '172.18.0.5')
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.authentication import is_token_revoked
+
+
+def denied_token_cache_key(jti):
+    return f'accounts:refresh_token:{jti}:denied'
+
+
+def is_refresh_token_denied(jti):
+    from accounts.models import RevokedToken
+
+    if cache.get(denied_token_cache_key(jti)):
+        return True
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def deny_refresh_token(jti, expires_at):
+    """
+    Add the token to the denylist for the rest of its lifetime.
+
+    Raises TokenError if it already was there, so of two requests rotating the same token only one wins.
+    """
+    from accounts.models import RevokedToken
+
+    try:
+        RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        raise TokenError('Token is blacklisted')
+    ttl = int((expires_at - timezone.now()).total_seconds())
+    if ttl > 0:
+        cache.set(denied_token_cache_key(jti), True, ttl)
+
+
+class RotatingRefreshToken(RefreshToken):
+    """A refresh token checked against the RevokedToken denylist and denied once it has been rotated."""
+
+    def verify(self):
+        super().verify()
+        if is_refresh_token_denied(self[api_settings.JTI_CLAIM]):
+            raise TokenError('Token is blacklisted')
+        if is_token_revoked(self):
+            raise TokenError('Token has been revoked')
+
+    def blacklist(self):
+        expires_at = datetime.fromtimestamp(self['exp'], tz=dt_timezone.utc)
+        deny_refresh_token(self[api_settings.JTI_CLAIM], expires_at)
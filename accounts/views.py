@@ -1 +1,22 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from accounts.login import login_metrics
+from accounts.serializers import MissionsTokenObtainPairSerializer, RotatingTokenRefreshSerializer
+
+
+class MissionsTokenObtainPairView(TokenObtainPairView):
+    serializer_class = MissionsTokenObtainPairSerializer
+
+
+class RotatingTokenRefreshView(TokenRefreshView):
+    serializer_class = RotatingTokenRefreshSerializer
+
+
+class LoginMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(login_metrics.snapshot())
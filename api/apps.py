@@ -1,6 +1,24 @@
+from functools import partial
+
 from django.apps import AppConfig
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api.caching import bump_version
+        from core.models import College, Campus, Unit, Department
+
+        def invalidate_reference_data(sender, **kwargs):
+            # Once the change commits, or a concurrent request could cache the old rows under the new version.
+            transaction.on_commit(partial(bump_version, sender))
+
+        for model in (College, Campus, Unit, Department):
+            post_save.connect(invalidate_reference_data, sender=model, weak=False,
+                              dispatch_uid=f'invalidate_reference_data_{model._meta.label_lower}')
+            post_delete.connect(invalidate_reference_data, sender=model, weak=False,
+                                dispatch_uid=f'invalidate_reference_data_{model._meta.label_lower}')
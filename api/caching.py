@@ -0,0 +1,175 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import DateTimeField, F, Max
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.cache import patch_cache_control, patch_vary_headers, get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from api.serializers import get_modified_lookups
+
+REFERENCE_DATA_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class LocalCache:
+    """A small thread-safe LRU kept in process memory in front of the shared cache."""
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache()
+
+
+def shared_cache():
+    return caches[getattr(settings, 'REFERENCE_DATA_CACHE_ALIAS', 'default')]
+
+
+def version_key(model):
+    return f'api:reference_data:version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    """Return the current cache version of each model, one shared cache round-trip for all of them."""
+    cache = shared_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    """Invalidate every cached response built from ``model``."""
+    shared_cache().set(version_key(model), uuid.uuid4().hex, None)
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix('W/') for candidate in if_none_match.split(',')}
+    return '*' in candidates or etag in candidates
+
+
+class CachedReadMixin:
+    """
+    Serve GET responses from a versioned read-through cache, local memory first and then the shared cache,
+    answering ``If-None-Match`` with 304.
+
+    ``cache_models`` lists every model the serialized payload is built from; saving or deleting any of them
+    invalidates the cached responses, see api.apps.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request):
+        versions = ':'.join(get_versions(self.cache_models))
+        return (f'api:reference_data:{type(self).__name__}:{versions}:{int(request.user.is_staff)}:'
+                f'{request.get_full_path()}')
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        entry = local_cache.get(key)
+        if entry is None:
+            entry = shared_cache().get(key)
+            if entry is not None:
+                local_cache.set(key, entry)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content = JSONRenderer().render(response.data)
+            entry = (response.data, f'"{hashlib.md5(content).hexdigest()}"')
+            shared_cache().set(key, entry, REFERENCE_DATA_CACHE_TIMEOUT)
+            local_cache.set(key, entry)
+
+        data, etag = entry
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class ConditionalRetrieveMixin:
+    """
+    Answer conditional GETs of a single object with 304 before serializing it.
+
+    ``Last-Modified`` and the ETag come from the most recent ``modified`` of the object and of every nested object
+    its serializer renders, read with one aggregate query. Without a ``modified`` on each of them, the response
+    carries no validators.
+    """
+
+    def get_last_modified(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = type(self).queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        lookups = get_modified_lookups(self.get_serializer())
+        if lookups is None:
+            return None
+        expressions = []
+        for lookup, many in lookups:
+            if many:
+                expressions.append(Coalesce(Max(lookup), F('modified'), output_field=DateTimeField()))
+            elif lookup == 'modified':
+                expressions.append(F(lookup))
+            else:
+                expressions.append(Coalesce(F(lookup), F('modified'), output_field=DateTimeField()))
+        if len(expressions) > 1:
+            last_modified = Greatest(*expressions, output_field=DateTimeField())
+        else:
+            last_modified = expressions[0]
+        return queryset.annotate(last_modified=last_modified).values_list('last_modified', flat=True).first()
+
+    def retrieve(self, request, *args, **kwargs):
+        last_modified = self.get_last_modified()
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        timestamp = int(last_modified.timestamp())
+        version = f'{request.get_full_path()}:{last_modified.isoformat()}:{int(request.user.is_staff)}'
+        etag = f'"{hashlib.md5(version.encode()).hexdigest()}"'
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
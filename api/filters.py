@@ -0,0 +1,34 @@
+from django_filters import rest_framework as filters
+
+from core.models import MissionOrder, DestinationChoices, ApprovalStatusChoices, MissionStatistic, Vehicle
+
+
+class MissionOrderFilter(filters.FilterSet):
+    destination = filters.MultipleChoiceFilter(choices=DestinationChoices.choices)
+    departure_date = filters.DateFromToRangeFilter()
+    returning_date = filters.DateFromToRangeFilter()
+    approval_status = filters.ChoiceFilter(field_name='status', choices=ApprovalStatusChoices.choices)
+    cost = filters.RangeFilter()
+
+    class Meta:
+        model = MissionOrder
+        fields = ('staff', 'unit', 'destination', 'departure_date', 'returning_date', 'approval_status',
+                  'current_approver', 'cost')
+
+
+class MissionStatisticFilter(filters.FilterSet):
+    college = filters.NumberFilter(field_name='unit__college')
+    destination = filters.MultipleChoiceFilter(choices=DestinationChoices.choices)
+    month = filters.DateFromToRangeFilter()
+
+    class Meta:
+        model = MissionStatistic
+        fields = ('unit', 'college', 'destination', 'month')
+
+
+class VehicleFilter(filters.FilterSet):
+    seats = filters.NumberFilter(field_name='seats', lookup_expr='gte')
+
+    class Meta:
+        model = Vehicle
+        fields = ('campus', 'seats', 'active')
@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedCursorPagination(CursorPagination):
+    ordering = ('-created', '-id')
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ApprovalInboxPagination(CreatedCursorPagination):
+    ordering = ('created', 'id')
+
+
+class SearchPagination(PageNumberPagination):
+    """Search results are ordered by rank, which a cursor cannot follow."""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,47 +1,273 @@
+from django.db import transaction, IntegrityError
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
 from accounts.models import CustomUser
 from core.models import College, Unit, Department, Campus, Staff, MissionOrder, Transportation, MissionAttachment, \
-    MissionRoleChoices, DestinationChoices, Approval
-from django.contrib.auth.models import Group, Permission
-
+    MissionRoleChoices, DestinationChoices, Approval, ApprovalDetails, Notification, UploadSession, Vehicle, Driver, \
+    VehicleBooking, PoolingProposal
+from core.costs import get_rate_index
+from core.notifications import approval_request_notifications
+from core.overlaps import overlapping_missions, find_conflicts
+from core.routing import get_next_approver_ids
+from core.statistics import record_missions
+from core.uploads import validate_upload
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+
+def get_eager_loading(serializer, prefix='', prefetching=False):
+    """
+    Walk the fields of ``serializer`` and return the ``select_related`` and ``prefetch_related`` lookups needed
+    to render it without issuing queries per object.
+    """
+    select_related, prefetch_related = [], []
+    # Meta.prefetch_related maps a field to the lookups it reads, e.g. in a SerializerMethodField.
+    for name, lookups in getattr(getattr(serializer, 'Meta', None), 'prefetch_related', {}).items():
+        if name in serializer.fields:
+            prefetch_related += [prefix + lookup for lookup in lookups]
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        lookup = prefix + field.source
+        if isinstance(field, serializers.ListSerializer):
+            prefetch_related.append(lookup)
+            nested_select, nested_prefetch = get_eager_loading(field.child, lookup + '__', prefetching=True)
+            prefetch_related += nested_select + nested_prefetch
+        elif isinstance(field, serializers.BaseSerializer):
+            (prefetch_related if prefetching else select_related).append(lookup)
+            nested_select, nested_prefetch = get_eager_loading(field, lookup + '__', prefetching)
+            select_related += nested_select
+            prefetch_related += nested_prefetch
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch_related.append(lookup)
+    return select_related, prefetch_related
+
+
+def get_modified_lookups(serializer, prefix='', many=False):
+    """
+    Return ``(lookup, many)`` for the ``modified`` timestamp of every object rendered by ``serializer``,
+    ``many`` telling whether the lookup goes through a to-many relation.
+
+    Returns None when one of the rendered models has no ``modified``: its changes could not be told apart.
+    """
+    lookups = []
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is not None:
+        if not any(field.name == 'modified' for field in model._meta.fields):
+            return None
+        lookups.append((prefix + 'modified', many))
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            nested = get_modified_lookups(field.child, prefix + field.source + '__', many=True)
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = get_modified_lookups(field, prefix + field.source + '__', many)
+        else:
+            continue
+        if nested is None:
+            return None
+        lookups += nested
+    return lookups
+
+
+def setup_eager_loading(serializer, queryset):
+    select_related, prefetch_related = get_eager_loading(serializer)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
+def parse_field_paths(value):
+    """Turn ``'id,staff.first_name,staff.unit'`` into ``{'id': {}, 'staff': {'first_name': {}, 'unit': {}}}``."""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsMixin:
+    """
+    Let GET requests shape the payload, and with it the queries planned by get_eager_loading():
+
+    - ``?fields=id,staff.first_name`` keeps only the listed fields, dotted paths selecting inside nested objects,
+    - ``?expand=staff,staff.unit`` renders only the listed nested objects, the others collapse to their ids.
+    """
+
+    def get_nesting_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+        path = self.get_nesting_path()
+
+        if request.query_params.get('fields'):
+            requested = parse_field_paths(request.query_params['fields'])
+            for name in path:
+                requested = requested.get(name)
+                if not requested:
+                    break
+            if requested:
+                fields = {name: field for name, field in fields.items() if name in requested}
+
+        if 'expand' in request.query_params:
+            expanded = parse_field_paths(request.query_params['expand'])
+            for name in path:
+                expanded = expanded.get(name, {})
+            for name, field in fields.items():
+                if isinstance(field, serializers.BaseSerializer) and name not in expanded:
+                    fields[name] = serializers.PrimaryKeyRelatedField(
+                        source=field.source, many=isinstance(field, serializers.ListSerializer), read_only=True)
+        return fields
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolve primary keys from the objects a BatchListSerializer loaded for the whole batch, if any."""
+
+    def to_internal_value(self, data):
+        prefetched = getattr(self.parent, '_prefetched_related', {}).get(self.field_name)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in prefetched:
+            self.fail('does_not_exist', pk_value=data)
+        return prefetched[pk]
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    Validate a batch of records with one ``IN`` query per related field and per unique field, instead of
+    the per-record lookups done by the child serializer.
+    """
+
+    def to_internal_value(self, data):
+        related_fields = {
+            name: field for name, field in self.child.fields.items()
+            if isinstance(field, PrefetchedPrimaryKeyRelatedField) and not field.read_only
+        }
+        if isinstance(data, list):
+            self.child._prefetched_related = {
+                name: field.get_queryset().in_bulk(self.get_pks(field, data))
+                for name, field in related_fields.items()
+            }
+        try:
+            validated_data = super().to_internal_value(data)
+        finally:
+            self.child._prefetched_related = {}
+        self.validate_unique(validated_data)
+        return validated_data
+
+    def get_pks(self, field, data):
+        model_pk = field.get_queryset().model._meta.pk
+        pks = set()
+        for item in data:
+            if not isinstance(item, dict) or item.get(field.field_name) is None:
+                continue
+            try:
+                pks.add(model_pk.to_python(item[field.field_name]))
+            except (TypeError, ValueError, DjangoValidationError):
+                continue
+        return pks
+
+    def validate_unique(self, validated_data):
+        model = self.child.Meta.model
+        errors = [{} for _ in validated_data]
+        for model_field in model._meta.fields:
+            field = self.child.fields.get(model_field.name)
+            if not model_field.unique or model_field.primary_key or field is None or field.read_only:
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                # A nested object, e.g. a mission's own transportation, is created with the record: nothing to
+                # compare with the others or the database.
+                continue
+            values = {}
+            for index, item in enumerate(validated_data):
+                value = item.get(model_field.name)
+                if value is None:
+                    continue
+                value = getattr(value, 'pk', value)
+                if value in values:
+                    errors[index][model_field.name] = [f"This {model_field.verbose_name} is repeated in the batch."]
+                values.setdefault(value, index)
+            existing = model.objects.filter(**{f'{model_field.attname}__in': values}).values_list(
+                model_field.attname, flat=True)
+            for value in existing:
+                errors[values[value]][model_field.name] = [
+                    f"A {model.__name__.lower()} with this {model_field.verbose_name} already exists."]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+
+class BaseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
 
-class BaseSerializer(serializers.ModelSerializer):
     class Meta:
         model = None
         fields = '__all__'
         read_only_fields = ('created', 'modified')
+        list_serializer_class = BatchListSerializer
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         request = self.context.get('request')
         if request and request.user.is_staff:
-            representation['created'] = instance.created
-            representation['modified'] = instance.modified
+            if 'created' in self.fields:
+                representation['created'] = instance.created
+            if 'modified' in self.fields:
+                representation['modified'] = instance.modified
         else:
-            del representation['created']
-            del representation['modified']
+            representation.pop('created', None)
+            representation.pop('modified', None)
         return representation
 
 
 class BaseWriteSerializer(BaseSerializer):
+    def get_fields(self):
+        # Uniqueness is enforced by the database constraints, see save(), and checked in bulk by BatchListSerializer.
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [validator for validator in field.validators
+                                if not isinstance(validator, UniqueValidator)]
+        return fields
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                f"This {self.Meta.model.__name__.lower()} conflicts with an existing one.")
+
     def validate_name(self, value):
         if not value:
             raise serializers.ValidationError("The name field cannot be blank.")
-        if self.Meta.model.objects.filter(name=value).exists():
-            raise serializers.ValidationError(f"A {self.Meta.model.__name__.lower()} with this name already exists.")
         return value
 
     def validate_short_name(self, value):
         if not value:
             raise serializers.ValidationError("The short_name field cannot be blank.")
-        if self.Meta.model.objects.filter(short_name=value).exists():
-            raise serializers.ValidationError(
-                f"A {self.Meta.model.__name__.lower()} with this short name already exists.")
         return value
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     groups = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -60,10 +286,11 @@ class UserSerializer(serializers.ModelSerializer):
             'password': {'write_only': True},
             'permissions': {'read_only': True},
         }
+        prefetch_related = {'permissions': ('user_permissions', 'groups__permissions')}
 
     def get_permissions(self, obj):
         return ([perm.codename for perm in obj.user_permissions.all()] +
-                [perm.codename for perm in Permission.objects.filter(group__user=obj)])
+                [perm.codename for group in obj.groups.all() for perm in group.permissions.all()])
 
     def create(self, validated_data):
         password = validated_data.pop('password')
@@ -119,11 +346,6 @@ class DepartmentWriteSerializer(BaseWriteSerializer):
         model = Department
         fields = ('id', 'name', 'short_name', 'description', 'unit', 'created', 'modified')
 
-    def validate_unit(self, value):
-        if not Unit.objects.filter(id=value).exists():
-            raise serializers.ValidationError("The specified unit does not exist.")
-        return value
-
 
 class CampusSerializer(BaseSerializer):
     class Meta(BaseSerializer.Meta):
@@ -152,13 +374,6 @@ class StaffWriteSerializer(BaseWriteSerializer):
             'id', 'user', 'first_name', 'last_name', 'gender', 'type', 'unit', 'campus', 'phone_number', 'created',
             'modified')
 
-    def validate_user(self, value):
-        if not CustomUser.objects.filter(id=value).exists():
-            raise serializers.ValidationError("The specified user does not exist.")
-        if Staff.objects.filter(user_id=value).exists():
-            raise serializers.ValidationError("The specified user is already a staff.")
-        return value
-
     def validate_first_name(self, value):
         if not value:
             raise serializers.ValidationError("The first_name field cannot be blank.")
@@ -179,16 +394,6 @@ class StaffWriteSerializer(BaseWriteSerializer):
             raise serializers.ValidationError("The type must be either 'T' (Teaching) or 'NT' (Non-Teaching).")
         return value
 
-    def validate_unit(self, value):
-        if not Unit.objects.filter(id=value).exists():
-            raise serializers.ValidationError("The specified unit does not exist.")
-        return value
-
-    def validate_campus(self, value):
-        if not Campus.objects.filter(id=value).exists():
-            raise serializers.ValidationError("The specified campus does not exist.")
-        return value
-
     def validate_phone_number(self, value):
         # Check if phone number starts with country code and total length is 12
         if not (value.isdigit() and len(value) == 12):
@@ -198,15 +403,72 @@ class StaffWriteSerializer(BaseWriteSerializer):
 
 
 class MissionOrderAttachmentSerializer(BaseSerializer):
+    download_url = serializers.HyperlinkedIdentityField(view_name='mission-attachment-download')
+
     class Meta(BaseSerializer.Meta):
         model = MissionAttachment
-        fields = ('id', 'mission_order', 'attachment', 'created', 'modified')
+        fields = ('id', 'mission_order', 'attachment', 'download_url', 'original_name', 'content_type', 'size',
+                  'sha256', 'created', 'modified')
+        read_only_fields = ('original_name', 'content_type', 'size', 'sha256')
+        # The files are only served through the download view, which checks who may read them.
+        extra_kwargs = {
+            'attachment': {'write_only': True},
+        }
+
+
+class UploadSessionSerializer(BaseSerializer):
+    class Meta(BaseSerializer.Meta):
+        model = UploadSession
+        fields = ('id', 'mission_order', 'filename', 'content_type', 'size', 'offset', 'created', 'modified')
+        read_only_fields = ('mission_order', 'offset')
+
+    def validate(self, data):
+        validate_upload(data['content_type'], data['size'])
+        return data
 
 
 class TransportationSerializer(BaseSerializer):
     class Meta(BaseSerializer.Meta):
         model = Transportation
-        fields = ('id', 'transportation_means', 'vehicle_identification', 'driver_name', 'created', 'modified')
+        fields = ('id', 'transportation_means', 'vehicle_identification', 'driver_name', 'booking', 'created',
+                  'modified')
+        read_only_fields = ('booking', 'created', 'modified')
+
+
+class VehicleSerializer(BaseWriteSerializer):
+    class Meta(BaseSerializer.Meta):
+        model = Vehicle
+        fields = ('id', 'plate_number', 'description', 'seats', 'campus', 'active', 'created', 'modified')
+
+
+class DriverSerializer(BaseWriteSerializer):
+    class Meta(BaseSerializer.Meta):
+        model = Driver
+        fields = ('id', 'name', 'phone_number', 'campus', 'active', 'created', 'modified')
+
+
+class VehicleBookingSerializer(BaseSerializer):
+    vehicle = PrefetchedPrimaryKeyRelatedField(queryset=Vehicle.objects.all())
+    driver = PrefetchedPrimaryKeyRelatedField(queryset=Driver.objects.all())
+
+    class Meta(BaseSerializer.Meta):
+        model = VehicleBooking
+        fields = ('id', 'vehicle', 'driver', 'start_date', 'end_date', 'transportations', 'created', 'modified')
+        read_only_fields = ('start_date', 'end_date', 'transportations', 'created', 'modified')
+
+
+class PoolingProposalSerializer(BaseSerializer):
+    class Meta(BaseSerializer.Meta):
+        model = PoolingProposal
+        fields = ('id', 'campus', 'destination', 'start_date', 'end_date', 'missions', 'booking', 'created',
+                  'modified')
+
+
+class ApprovalDetailsSerializer(BaseSerializer):
+    class Meta(BaseSerializer.Meta):
+        model = ApprovalDetails
+        fields = ('id', 'done_at', 'done_on', 'authorized_by', 'authorized_signature', 'acknowledged_by_hr',
+                  'visa_for_destination', 'arrival_date', 'departure_date', 'created', 'modified')
 
 
 class MissionOrderReadSerializer(BaseSerializer):
@@ -220,13 +482,14 @@ class MissionOrderReadSerializer(BaseSerializer):
         fields = (
             'id', 'staff', 'unit', 'role', 'purpose_of_mission', 'expected_results', 'destination', 'distance_km',
             'departure_date', 'returning_date', 'duration_days', 'duration_nights', 'transportation', 'supervisor_name',
-            'supervisor_signature', 'approval_details', 'attachments', 'created', 'modified'
+            'supervisor_signature', 'approval_details', 'attachments', 'status', 'stage', 'current_approver', 'cost',
+            'created', 'modified'
         )
 
 
 class MissionOrderWriteSerializer(BaseWriteSerializer):
-    staff = serializers.PrimaryKeyRelatedField(queryset=Staff.objects.all())
-    unit = serializers.PrimaryKeyRelatedField(queryset=Unit.objects.all())
+    staff = PrefetchedPrimaryKeyRelatedField(queryset=Staff.objects.all())
+    unit = PrefetchedPrimaryKeyRelatedField(queryset=Unit.objects.all())
     attachments = MissionOrderAttachmentSerializer(many=True, required=False)
     transportation = TransportationSerializer(required=False)
     role = serializers.ChoiceField(choices=MissionRoleChoices.choices, default=MissionRoleChoices.choices[0][0])
@@ -237,18 +500,29 @@ class MissionOrderWriteSerializer(BaseWriteSerializer):
         fields = (
             'id', 'staff', 'unit', 'role', 'purpose_of_mission', 'expected_results', 'destination', 'distance_km',
             'departure_date', 'returning_date', 'duration_days', 'duration_nights', 'transportation', 'supervisor_name',
-            'supervisor_signature', 'approval_details', 'attachments', 'created', 'modified'
+            'supervisor_signature', 'approval_details', 'attachments', 'cost', 'created', 'modified'
         )
 
     def validate(self, data):
-        if data['departure_date'] > data['returning_date']:
-            raise serializers.ValidationError("The departure date cannot be later than the returning date.")
-        if data['duration_days'] < 1:
-            raise serializers.ValidationError("The duration days must be positive numbers.")
-        if 'staff' in data and not Staff.objects.filter(id=data['staff']).exists():
-            raise serializers.ValidationError("The specified staff does not exist.")
-        if 'unit' in data and not Unit.objects.filter(id=data['unit']).exists():
-            raise serializers.ValidationError("The specified unit does not exist.")
+        # Partial updates only send the changed fields.
+        staff = data.get('staff', getattr(self.instance, 'staff', None))
+        departure_date = data.get('departure_date', getattr(self.instance, 'departure_date', None))
+        returning_date = data.get('returning_date', getattr(self.instance, 'returning_date', None))
+        if departure_date >= returning_date:
+            raise serializers.ValidationError("The returning date must be later than the departure date.")
+        booking = getattr(getattr(self.instance, 'transportation', None), 'booking', None)
+        if booking and (departure_date < booking.start_date or returning_date > booking.end_date):
+            raise serializers.ValidationError(
+                f"The vehicle is only booked from {booking.start_date} to {booking.end_date}, cancel the booking "
+                f"before moving the mission.")
+        conflicts = overlapping_missions(MissionOrder.objects.filter(staff=staff), departure_date, returning_date)
+        if self.instance is not None:
+            conflicts = conflicts.exclude(pk=self.instance.pk)
+        conflict = conflicts.order_by('departure_date').values('id', 'departure_date', 'returning_date').first()
+        if conflict:
+            raise serializers.ValidationError(
+                f"This staff member is already on mission {conflict['id']} from {conflict['departure_date']} to "
+                f"{conflict['returning_date']}.")
         return data
 
     def create(self, validated_data):
@@ -260,16 +534,141 @@ class MissionOrderWriteSerializer(BaseWriteSerializer):
         validated_data['duration_nights'] = validated_data['duration_days'] - 1 if validated_data[
                                                                                        'duration_days'] > 0 else 0
 
+        if transportation_data:
+            validated_data['transportation'] = Transportation.objects.create(**transportation_data)
         mission_order = MissionOrder.objects.create(**validated_data)
         for attachment_data in attachments_data:
             MissionAttachment.objects.create(mission_order=mission_order, **attachment_data)
-        if transportation_data:
-            Transportation.objects.create(mission_order=mission_order, **transportation_data)
         return mission_order
 
 
 class MissionOrderApprovalSerializer(BaseSerializer):
     class Meta(BaseSerializer.Meta):
         model = Approval
-        fields = ('id', 'mission_order', 'approver', 'status', 'approval_date', 'comments', 'rejected',
+        fields = ('id', 'mission_order', 'approver', 'stage', 'status', 'approval_date', 'comments', 'rejected',
+                  'rejection_reason', 'created', 'modified')
+        # Approvals are only created and decided by core.workflow, through the approve and reject endpoints.
+        read_only_fields = fields
+
+
+class ApprovalReadSerializer(BaseSerializer):
+    mission_order = MissionOrderReadSerializer(read_only=True)
+
+    class Meta(BaseSerializer.Meta):
+        model = Approval
+        fields = ('id', 'mission_order', 'approver', 'stage', 'status', 'approval_date', 'comments', 'rejected',
                   'rejection_reason', 'created', 'modified')
+
+
+class ApprovalDecisionSerializer(serializers.Serializer):
+    comments = serializers.CharField(required=False, allow_blank=True)
+    rejection_reason = serializers.CharField(required=False, allow_blank=True)
+
+
+class PeriodSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if 'date' in data:
+            return {'start': data['date'], 'end': data['date']}
+        if 'start' not in data or 'end' not in data:
+            raise serializers.ValidationError("Give either a date, or a start and an end.")
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("The start cannot be later than the end.")
+        return data
+
+
+class MissionOrderBulkItemSerializer(BaseWriteSerializer):
+    staff = PrefetchedPrimaryKeyRelatedField(queryset=Staff.objects.all())
+    unit = PrefetchedPrimaryKeyRelatedField(queryset=Unit.objects.all())
+    transportation = TransportationSerializer(required=False)
+    approval_details = ApprovalDetailsSerializer(required=False)
+    role = serializers.ChoiceField(choices=MissionRoleChoices.choices, default=MissionRoleChoices.choices[0][0])
+    destination = serializers.ChoiceField(choices=DestinationChoices.choices, default=DestinationChoices.choices[0][0])
+
+    class Meta(BaseSerializer.Meta):
+        model = MissionOrder
+        fields = (
+            'id', 'staff', 'unit', 'role', 'purpose_of_mission', 'expected_results', 'destination', 'distance_km',
+            'departure_date', 'returning_date', 'transportation', 'supervisor_name', 'supervisor_signature',
+            'approval_details', 'created', 'modified'
+        )
+
+    def validate(self, data):
+        if data['departure_date'] >= data['returning_date']:
+            raise serializers.ValidationError("The returning date must be later than the departure date.")
+        return data
+
+
+class MissionOrderBulkWriteSerializer(serializers.Serializer):
+    """
+    Create the missions of a whole team at once. ``transportation`` and ``approval_details`` are shared by every
+    mission that does not provide its own; each mission still gets its own copy as the relations are one-to-one.
+    """
+    transportation = TransportationSerializer(required=False)
+    approval_details = ApprovalDetailsSerializer(required=False)
+    missions = MissionOrderBulkItemSerializer(many=True, allow_empty=False)
+
+    def validate(self, data):
+        staff_ids = [mission['staff'].pk for mission in data['missions']]
+        if len(staff_ids) != len(set(staff_ids)):
+            raise serializers.ValidationError("A staff member can only appear once in a bulk mission.")
+        conflicts = find_conflicts([(mission['staff'].pk, mission['departure_date'], mission['returning_date'])
+                                    for mission in data['missions']])
+        if conflicts:
+            errors = []
+            for mission in data['missions']:
+                errors.append({})
+                if mission['staff'].pk in conflicts:
+                    mission_id, departure_date, returning_date = conflicts[mission['staff'].pk]
+                    errors[-1]['staff'] = [f"This staff member is already on mission {mission_id} from "
+                                           f"{departure_date} to {returning_date}."]
+            raise serializers.ValidationError({'missions': errors})
+        for mission in data['missions']:
+            if 'transportation' not in mission and 'transportation' not in data:
+                raise serializers.ValidationError("Every mission needs transportation details.")
+            if 'approval_details' not in mission and 'approval_details' not in data:
+                raise serializers.ValidationError("Every mission needs approval details.")
+        return data
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            # A concurrent request booked one of the staff members since validate(), see core.overlaps.
+            raise serializers.ValidationError(
+                "One of these staff members is already on another mission on these dates.")
+
+    @transaction.atomic
+    def create(self, validated_data):
+        missions_data = validated_data['missions']
+        transportations = Transportation.objects.bulk_create([
+            Transportation(**mission.pop('transportation', validated_data.get('transportation')))
+            for mission in missions_data
+        ])
+        approval_details = ApprovalDetails.objects.bulk_create([
+            ApprovalDetails(**mission.pop('approval_details', validated_data.get('approval_details')))
+            for mission in missions_data
+        ])
+        next_approver_ids = get_next_approver_ids([mission['staff'] for mission in missions_data])
+        rate_index = get_rate_index()
+        missions = []
+        for mission_data, mission_transportation, mission_approval_details in zip(
+                missions_data, transportations, approval_details):
+            mission = MissionOrder(transportation=mission_transportation, approval_details=mission_approval_details,
+                                   current_approver_id=next_approver_ids[mission_data['staff'].pk], **mission_data)
+            mission.compute_durations()
+            mission.compute_cost(rate_index)
+            missions.append(mission)
+        missions = MissionOrder.objects.bulk_create(missions)
+        record_missions(missions)
+
+        approvals = Approval.objects.bulk_create([
+            Approval(mission_order=mission, approver_id=next_approver_ids[mission.staff_id])
+            for mission in missions if next_approver_ids[mission.staff_id]
+        ])
+        Notification.objects.bulk_create(approval_request_notifications(approvals))
+        return missions
@@ -1,3 +1,546 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from accounts.serializers import MissionsTokenObtainPairSerializer
+from api.serializers import get_modified_lookups
+from core.models import College, Unit, Campus, Staff, MissionOrder, Transportation, ApprovalDetails, Approval, \
+    ApprovalStatusChoices, MissionAttachment, UploadSession, Vehicle, Driver, VehicleBooking
+from core.pooling import propose_pools
+from core.uploads import UploadOffsetConflict, write_chunk
+
+
+class MissionsTestCase(TestCase):
+    """A unit with its manager, a campus manager and a staff member, each in their group."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups_and_permissions', stdout=io.StringIO())
+        cls.college = College.objects.create(name='College of Science and Technology', short_name='CST')
+        cls.unit = Unit.objects.create(name='School of ICT', short_name='ICT', college=cls.college)
+        cls.campus = Campus.objects.create(name='Nyarugenge')
+        cls.manager = cls.create_staff('manager@ur.ac.rw', 'Unit Manager', '250788000001')
+        cls.unit.manager = cls.manager
+        cls.unit.save()
+        cls.campus_manager = cls.create_staff('campus.manager@ur.ac.rw', 'Campus Manager', '250788000002')
+        cls.staff = cls.create_staff('staff@ur.ac.rw', 'Staff', '250788000003')
+
+    def setUp(self):
+        # The approval routing and the group names are cached, and ids are reused from one test to the next.
+        cache.clear()
+
+    @classmethod
+    def create_staff(cls, email, group, phone_number):
+        user = CustomUser.objects.create_user(email, 'Missions@2024')
+        user.groups.add(Group.objects.get(name=group))
+        return Staff.objects.create(user=user, first_name=email.split('@')[0], last_name='Test', gender='MALE',
+                                    unit=cls.unit, campus=cls.campus, phone_number=phone_number)
+
+    def create_mission(self, staff, departure_date, returning_date, **kwargs):
+        return MissionOrder.objects.create(
+            staff=staff, unit=self.unit, role='LECTURER', purpose_of_mission='Teaching', expected_results='Courses',
+            destination='HUYE', departure_date=departure_date, returning_date=returning_date,
+            transportation=Transportation.objects.create(transportation_means='PROVIDED'),
+            supervisor_name='Supervisor', supervisor_signature='Signature',
+            approval_details=ApprovalDetails.objects.create(
+                done_at='Kigali', done_on=departure_date, authorized_by='Director', authorized_signature='Signature',
+                acknowledged_by_hr='HR'),
+            **kwargs)
+
+    def client_for(self, staff):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.get(pk=staff.user_id))
+        return client
+
+
+class MissionOrderBulkCreateTests(MissionsTestCase):
+    def mission_data(self, staff, **kwargs):
+        return {'staff': staff.pk, 'unit': self.unit.pk, 'purpose_of_mission': 'Teaching',
+                'expected_results': 'Courses', 'departure_date': '2024-03-01', 'returning_date': '2024-03-04',
+                'supervisor_name': 'Supervisor', 'supervisor_signature': 'Signature', **kwargs}
+
+    def bulk_data(self, missions):
+        return {
+            'transportation': {'transportation_means': 'PROVIDED'},
+            'approval_details': {'done_at': 'Kigali', 'done_on': '2024-02-20', 'authorized_by': 'Director',
+                                 'authorized_signature': 'Signature', 'acknowledged_by_hr': 'HR'},
+            'missions': missions,
+        }
+
+    def test_bulk_create(self):
+        response = self.client_for(self.manager).post('/api/missions-orders/bulk/', self.bulk_data([
+            self.mission_data(self.staff), self.mission_data(self.campus_manager),
+        ]), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 2)
+        missions = MissionOrder.objects.all()
+        self.assertEqual(missions.count(), 2)
+        # Each mission gets its own copy of the shared details, and its first approval.
+        self.assertEqual(len({mission.transportation_id for mission in missions}), 2)
+        self.assertEqual(MissionOrder.objects.get(staff=self.staff).current_approver, self.manager)
+
+    def test_bulk_create_with_own_transportation(self):
+        response = self.client_for(self.manager).post('/api/missions-orders/bulk/', self.bulk_data([
+            self.mission_data(self.staff, transportation={'transportation_means': 'PERSONAL'}),
+            self.mission_data(self.campus_manager),
+        ]), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(MissionOrder.objects.get(staff=self.staff).transportation.transportation_means, 'PERSONAL')
+        self.assertEqual(MissionOrder.objects.get(staff=self.campus_manager).transportation.transportation_means,
+                         'PROVIDED')
+
+    def test_bulk_create_is_validated_as_a_whole(self):
+        response = self.client_for(self.manager).post('/api/missions-orders/bulk/', self.bulk_data([
+            self.mission_data(self.staff),
+            self.mission_data(self.campus_manager, returning_date='2024-02-01'),
+        ]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MissionOrder.objects.exists())
+
+    def test_bulk_create_rejects_repeated_staff(self):
+        response = self.client_for(self.manager).post('/api/missions-orders/bulk/', self.bulk_data([
+            self.mission_data(self.staff), self.mission_data(self.staff, departure_date='2024-04-01',
+                                                             returning_date='2024-04-02'),
+        ]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MissionOrder.objects.exists())
+
+
+class MissionOrderConditionalGetTests(MissionsTestCase):
+    def test_update_invalidates_the_etag(self):
+        mission = self.create_mission(self.staff, date(2024, 3, 1), date(2024, 3, 4))
+        client = self.client_for(self.staff)
+        url = f'/api/missions-orders/{mission.pk}/'
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = client.patch(url, {'purpose_of_mission': 'Research'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['purpose_of_mission'], 'Research')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_nested_update_invalidates_the_etag(self):
+        mission = self.create_mission(self.staff, date(2024, 3, 1), date(2024, 3, 4))
+        client = self.client_for(self.staff)
+        url = f'/api/missions-orders/{mission.pk}/'
+        etag = client.get(url)['ETag']
+        mission.transportation.vehicle_identification = 'RAB 123 A'
+        mission.transportation.save()
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_user_changes_invalidate_the_etag(self):
+        mission = self.create_mission(self.staff, date(2024, 3, 1), date(2024, 3, 4))
+        client = self.client_for(self.manager)
+        url = f'/api/missions-orders/{mission.pk}/'
+        etag = client.get(url)['ETag']
+        user = CustomUser.objects.get(pk=self.staff.user_id)
+        user.email = 'staff.member@ur.ac.rw'
+        user.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['staff']['user']['email'], 'staff.member@ur.ac.rw')
+
+        etag = response['ETag']
+        user.groups.add(Group.objects.get(name='Unit Manager'))
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['staff']['user']['groups']), 2)
+
+    def test_no_validators_for_models_without_modified(self):
+        class GroupSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Group
+                fields = ('id', 'name')
+
+        self.assertIsNone(get_modified_lookups(GroupSerializer()))
+
+
+class ApprovalDecisionTests(MissionsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mission = self.create_mission(self.staff, date(2024, 3, 1), date(2024, 3, 4))
+        self.approval = Approval.objects.get(mission_order=self.mission)
+
+    def test_decision_moves_the_mission_to_the_next_stage(self):
+        response = self.client_for(self.manager).post(f'/api/missions-approvals/{self.approval.pk}/approve/',
+                                                      {'comments': 'Fine'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], ApprovalStatusChoices.APPROVED)
+        inbox = self.client_for(self.campus_manager).get('/api/missions-approvals/inbox/')
+        self.assertEqual([approval['mission_order']['id'] for approval in inbox.data['results']], [self.mission.pk])
+        self.assertEqual(self.client_for(self.manager).get('/api/missions-approvals/inbox/').data['results'], [])
+
+    def test_second_decision_conflicts(self):
+        client = self.client_for(self.manager)
+        self.assertEqual(client.post(f'/api/missions-approvals/{self.approval.pk}/approve/').status_code, 200)
+        response = client.post(f'/api/missions-approvals/{self.approval.pk}/reject/',
+                               {'rejection_reason': 'No budget'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.mission.refresh_from_db()
+        self.assertEqual((self.mission.status, self.mission.stage), (ApprovalStatusChoices.PENDING, 2))
+
+    def test_only_the_approver_decides(self):
+        response = self.client_for(self.campus_manager).post(f'/api/missions-approvals/{self.approval.pk}/approve/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_approvals_are_not_written_outside_the_workflow(self):
+        client = self.client_for(self.manager)
+        response = client.post('/api/missions-approvals/', {'mission_order': self.mission.pk,
+                                                           'approver': self.manager.pk, 'stage': 2}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = client.patch(f'/api/missions-approvals/{self.approval.pk}/', {'approver': self.staff.pk},
+                                format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(list(self.mission.approvals.values_list('approver', 'stage')), [(self.manager.pk, 1)])
+
+
+class MissionAttachmentTests(MissionsTestCase):
+    CONTENT = b'%PDF-1.4 mission report ' + b'x' * 100
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.mission = self.create_mission(self.staff, date(2024, 3, 1), date(2024, 3, 4))
+
+    def start_upload(self, client):
+        response = client.post(f'/api/missions-orders/{self.mission.pk}/uploads/', {
+            'filename': 'report.pdf', 'content_type': 'application/pdf', 'size': len(self.CONTENT),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response['Location']
+
+    def put_chunk(self, client, location, start, end):
+        return client.put(location, self.CONTENT[start:end], content_type='application/octet-stream',
+                          HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.CONTENT)}')
+
+    def upload(self, client):
+        location = self.start_upload(client)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.put_chunk(client, location, 0, len(self.CONTENT))
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_resumable_upload(self):
+        client = self.client_for(self.staff)
+        location = self.start_upload(client)
+        response = self.put_chunk(client, location, 0, 50)
+        self.assertEqual((response.status_code, response.data['offset']), (200, 50))
+        self.assertEqual(client.get(location).data['offset'], 50)
+        # A retried chunk the server already has does not start at the current offset.
+        self.assertEqual(self.put_chunk(client, location, 0, 50).status_code, 409)
+
+        response = self.put_chunk(client, location, 50, len(self.CONTENT))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['size'], len(self.CONTENT))
+        self.assertNotIn('attachment', response.data)
+        self.assertEqual(client.get(location).status_code, 404)
+
+    def test_failed_completion_is_retried(self):
+        client = self.client_for(self.staff)
+        client.raise_request_exception = False
+        location = self.start_upload(client)
+        with mock.patch.object(MissionAttachment.objects, 'create', side_effect=DatabaseError), \
+                self.assertLogs('django.request', 'ERROR'):
+            response = self.put_chunk(client, location, 0, len(self.CONTENT))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(client.get(location).data['offset'], len(self.CONTENT))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.put_chunk(client, location, 0, len(self.CONTENT))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(b''.join(client.get(response.data['download_url']).streaming_content), self.CONTENT)
+        # Neither the part file nor the chunks were left behind.
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'uploads')), [])
+
+    def test_chunk_is_appended_only_at_the_offset_it_was_sent_for(self):
+        self.start_upload(self.client_for(self.staff))
+        session = UploadSession.objects.get()
+        content = self.CONTENT
+
+        class ConcurrentStream(io.BytesIO):
+            def read(stream, size=-1):
+                if not stream.tell():
+                    # Another request appends the same chunk while this one is still being received.
+                    write_chunk(session, 0, io.BytesIO(content[:50]), 50)
+                return super().read(size)
+
+        with self.assertRaises(UploadOffsetConflict):
+            write_chunk(session, 0, ConcurrentStream(content[:50]), 50)
+        session.refresh_from_db()
+        self.assertEqual(session.offset, 50)
+        with open(os.path.join(self.media_root, 'uploads', f'{session.pk}.part'), 'rb') as part:
+            self.assertEqual(part.read(), content[:50])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'uploads')), [f'{session.pk}.part'])
+
+    def test_identical_files_are_stored_once(self):
+        client = self.client_for(self.staff)
+        self.upload(client)
+        self.upload(client)
+        first, second = MissionAttachment.objects.order_by('pk')
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        stored = [name for _, _, names in os.walk(self.media_root) for name in names]
+        self.assertEqual(len(stored), 1)
+
+    def test_only_the_owner_uploads(self):
+        response = self.client_for(self.campus_manager).post(f'/api/missions-orders/{self.mission.pk}/uploads/', {
+            'filename': 'report.pdf', 'content_type': 'application/pdf', 'size': len(self.CONTENT),
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_download_is_authorized(self):
+        download_url = self.upload(self.client_for(self.staff)).data['download_url']
+        for staff in (self.staff, self.manager):
+            response = self.client_for(staff).get(download_url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+            response.close()
+        # Neither the owner nor one of their approvers.
+        self.assertEqual(self.client_for(self.campus_manager).get(download_url).status_code, 404)
+
+
+class MissionOrderOverlapTests(MissionsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mission = self.create_mission(self.staff, date(2024, 3, 1), date(2024, 3, 4))
+
+    def post_mission(self, departure_date, returning_date):
+        approval_details = ApprovalDetails.objects.create(
+            done_at='Kigali', done_on='2024-02-20', authorized_by='Director', authorized_signature='Signature',
+            acknowledged_by_hr='HR')
+        return self.client_for(self.staff).post('/api/missions-orders/', {
+            'unit': self.unit.pk, 'purpose_of_mission': 'Research', 'expected_results': 'Report',
+            'departure_date': departure_date, 'returning_date': returning_date,
+            'transportation': {'transportation_means': 'PERSONAL'}, 'supervisor_name': 'Supervisor',
+            'supervisor_signature': 'Signature', 'approval_details': approval_details.pk,
+        }, format='json')
+
+    def test_overlapping_mission_is_rejected(self):
+        # Missions include both their departure and returning days.
+        response = self.post_mission('2024-03-04', '2024-03-06')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'already on mission {self.mission.pk}', str(response.data))
+        self.assertEqual(self.post_mission('2024-03-05', '2024-03-06').status_code, 201)
+
+    def test_rejected_mission_frees_its_dates(self):
+        Approval.objects.get(mission_order=self.mission).reject('No budget')
+        self.assertEqual(self.post_mission('2024-03-02', '2024-03-03').status_code, 201)
+
+    def test_bulk_create_reports_the_overlapping_mission(self):
+        response = self.client_for(self.manager).post('/api/missions-orders/bulk/', {
+            'transportation': {'transportation_means': 'PROVIDED'},
+            'approval_details': {'done_at': 'Kigali', 'done_on': '2024-02-20', 'authorized_by': 'Director',
+                                 'authorized_signature': 'Signature', 'acknowledged_by_hr': 'HR'},
+            'missions': [
+                {'staff': staff.pk, 'unit': self.unit.pk, 'purpose_of_mission': 'Teaching',
+                 'expected_results': 'Courses', 'departure_date': '2024-03-03', 'returning_date': '2024-03-05',
+                 'supervisor_name': 'Supervisor', 'supervisor_signature': 'Signature'}
+                for staff in (self.campus_manager, self.staff)
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missions'][0], {})
+        self.assertIn(f'already on mission {self.mission.pk}', str(response.data['missions'][1]['staff']))
+        self.assertEqual(MissionOrder.objects.count(), 1)
+
+
+class FleetTests(MissionsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mission = self.create_mission(self.staff, date(2024, 3, 1), date(2024, 3, 4))
+        self.vehicle = Vehicle.objects.create(plate_number='RAB 123 A', seats=4, campus=self.campus)
+        self.other_vehicle = Vehicle.objects.create(plate_number='RAB 456 B', seats=4, campus=self.campus)
+        self.driver = Driver.objects.create(name='Driver', phone_number='250788000011', campus=self.campus)
+        self.other_driver = Driver.objects.create(name='Other Driver', phone_number='250788000012',
+                                                  campus=self.campus)
+        self.client = self.client_for(self.campus_manager)
+
+    def book(self, mission, vehicle, driver):
+        return self.client.post(f'/api/missions-orders/{mission.pk}/booking/',
+                                {'vehicle': vehicle.pk, 'driver': driver.pk}, format='json')
+
+    def available(self, **params):
+        response = self.client.get('/api/vehicles/available/', params)
+        self.assertEqual(response.status_code, 200)
+        return [vehicle['plate_number'] for vehicle in response.data]
+
+    def test_booking(self):
+        response = self.book(self.mission, self.vehicle, self.driver)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['start_date'], response.data['end_date']), ('2024-03-01', '2024-03-04'))
+        self.mission.transportation.refresh_from_db()
+        self.assertEqual(self.mission.transportation.vehicle_identification, 'RAB 123 A')
+        # Booking again replaces the previous booking rather than conflicting with it.
+        self.assertEqual(self.book(self.mission, self.vehicle, self.other_driver).status_code, 201)
+        self.assertEqual(VehicleBooking.objects.get().driver, self.other_driver)
+
+    def test_vehicle_booked_twice_conflicts(self):
+        self.assertEqual(self.book(self.mission, self.vehicle, self.driver).status_code, 201)
+        other_mission = self.create_mission(self.manager, date(2024, 3, 4), date(2024, 3, 6))
+        self.assertEqual(self.book(other_mission, self.vehicle, self.other_driver).status_code, 409)
+        self.assertIsNone(Transportation.objects.get(pk=other_mission.transportation_id).booking)
+
+    def test_driver_booked_twice_conflicts(self):
+        self.assertEqual(self.book(self.mission, self.vehicle, self.driver).status_code, 201)
+        other_mission = self.create_mission(self.manager, date(2024, 2, 28), date(2024, 3, 1))
+        self.assertEqual(self.book(other_mission, self.other_vehicle, self.driver).status_code, 409)
+        self.assertEqual(self.book(other_mission, self.other_vehicle, self.other_driver).status_code, 201)
+
+    def test_available_vehicles(self):
+        Vehicle.objects.create(plate_number='RAB 789 C', seats=4, campus=self.campus, active=False)
+        self.assertEqual(self.book(self.mission, self.vehicle, self.driver).status_code, 201)
+        self.assertEqual(self.available(start='2024-03-02', end='2024-03-03'), ['RAB 456 B'])
+        self.assertEqual(self.available(start='2024-02-25', end='2024-03-01'), ['RAB 456 B'])
+        self.assertEqual(self.available(date='2024-03-05'), ['RAB 123 A', 'RAB 456 B'])
+        response = self.client.get('/api/vehicles/available/', {'start': '2024-03-05'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejection_releases_the_vehicle(self):
+        self.assertEqual(self.book(self.mission, self.vehicle, self.driver).status_code, 201)
+        approval = Approval.objects.get(mission_order=self.mission)
+        response = self.client_for(self.manager).post(f'/api/missions-approvals/{approval.pk}/reject/',
+                                                      {'rejection_reason': 'No budget'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(Transportation.objects.get(pk=self.mission.transportation_id).booking)
+        self.assertFalse(VehicleBooking.objects.exists())
+        self.assertEqual(self.available(date='2024-03-02'), ['RAB 123 A', 'RAB 456 B'])
+        # Nor can it be booked again.
+        self.assertEqual(self.book(self.mission, self.vehicle, self.driver).status_code, 400)
+
+
+    def test_vehicle_and_driver_of_another_campus(self):
+        campus = Campus.objects.create(name='Huye')
+        vehicle = Vehicle.objects.create(plate_number='RAC 123 A', seats=4, campus=campus)
+        driver = Driver.objects.create(name='Huye Driver', phone_number='250788000013', campus=campus)
+        self.assertEqual(self.book(self.mission, vehicle, driver).status_code, 400)
+        self.assertEqual(self.book(self.mission, vehicle, self.driver).status_code, 400)
+        self.assertEqual(self.book(self.mission, self.vehicle, driver).status_code, 400)
+        self.assertFalse(VehicleBooking.objects.exists())
+
+    def create_pool(self):
+        departure_date = timezone.localdate() + timedelta(days=10)
+        for staff in (self.staff, self.manager, self.campus_manager):
+            self.create_mission(staff, departure_date, departure_date + timedelta(days=2))
+        return propose_pools()
+
+    def test_pooling_proposals_fit_the_largest_vehicle(self):
+        Vehicle.objects.update(seats=2)
+        [proposal] = self.create_pool()
+        self.assertEqual(proposal.missions.count(), 2)
+
+        Vehicle.objects.update(active=False)
+        self.assertEqual(propose_pools(), [])
+
+    def test_accepting_a_pool_too_large_for_the_vehicle(self):
+        [proposal] = self.create_pool()
+        self.assertEqual(proposal.missions.count(), 3)
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(seats=2)
+        url = f'/api/vehicles/pooling/{proposal.pk}/accept/'
+        response = self.client.post(url, {'vehicle': self.vehicle.pk, 'driver': self.driver.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'vehicle': self.other_vehicle.pk, 'driver': self.driver.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(VehicleBooking.objects.get().transportations.count(), 3)
+
+
+class QueryCountTests(MissionsTestCase):
+    """Reads take a fixed number of queries whatever the number of objects, once the caches are warm."""
+
+    def setUp(self):
+        super().setUp()
+        for week in range(32):
+            departure_date = date(2024, 1, 1) + timedelta(weeks=week)
+            self.create_mission(self.staff, departure_date, departure_date + timedelta(days=2))
+        # The fixture created the staff record, which expires the token claims, in the second the token is issued.
+        CustomUser.objects.filter(pk=self.staff.user_id).update(claims_valid_after=None)
+        token = MissionsTokenObtainPairSerializer.get_token(CustomUser.objects.get(pk=self.staff.user_id))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        # Caches the token revocation and claims checks.
+        self.assertEqual(self.client.get('/api/missions-orders/?page_size=1').status_code, 200)
+
+    def test_mission_list_queries_do_not_depend_on_the_page_size(self):
+        for page_size in (2, 30):
+            # The missions, their attachments, and the groups and permissions of their staff users.
+            with self.assertNumQueries(5):
+                response = self.client.get(f'/api/missions-orders/?page_size={page_size}')
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_detail_queries_do_not_depend_on_the_nested_objects(self):
+        mission = MissionOrder.objects.filter(staff=self.staff).first()
+        url = f'/api/missions-orders/{mission.pk}/'
+        for count in (0, 3):
+            MissionAttachment.objects.bulk_create([
+                MissionAttachment(mission_order=mission, attachment=f'mission_attachments/{mission.pk}-{count}-{i}.pdf')
+                for i in range(count)
+            ])
+            # The ETag, the mission, its attachments, and the groups and permissions of its staff user.
+            with self.assertNumQueries(6):
+                response = self.client.get(url)
+            self.assertEqual(len(response.data['attachments']), count)
+        with self.assertNumQueries(5):
+            self.assertEqual(self.client.get(f'/api/staff/{self.staff.pk}/').status_code, 200)
+
+    def test_sparse_fields_shrink_the_queries(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/missions-orders/?page_size=30&fields=id,purpose_of_mission')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'purpose_of_mission'})
+        # Without expanding staff, it collapses to its id and nothing is loaded for its user.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/missions-orders/?page_size=30&expand=')
+        self.assertEqual(response.data['results'][0]['staff'], self.staff.pk)
+
+    def test_group_checks_read_the_token(self):
+        # The permission check reads the groups from the token claims, without loading the user or their groups.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/users/').status_code, 403)
+
+
+class CachedReadTests(MissionsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.staff)
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get('/api/colleges/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/colleges/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_changes_bump_the_version_on_commit(self):
+        etag = self.client.get('/api/colleges/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.college.name = 'College of Education'
+            self.college.save()
+            # Until the change commits, the cached payload stays the committed one.
+            self.assertEqual(self.client.get('/api/colleges/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.get('/api/colleges/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['name'], 'College of Education')
+
+    def test_staff_users_get_their_own_payload(self):
+        admin = CustomUser.objects.create_user('admin@ur.ac.rw', 'Missions@2024', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        self.assertIn('modified', client.get(f'/api/colleges/{self.college.pk}/').data)
+        self.assertNotIn('modified', self.client.get(f'/api/colleges/{self.college.pk}/').data)
+        self.assertIn('modified', client.get(f'/api/colleges/{self.college.pk}/').data)
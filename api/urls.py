@@ -1,29 +1,57 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+
+from core.models import ApprovalStatusChoices
 from .views import UserViewSet, CollegeViewSet, CampusViewSet, DepartmentRetrieveUpdateDestroyView, \
     DepartmentCreateView, UnitRetrieveUpdateDestroyView, UnitCreateView, StaffCreateView, \
-    StaffRetrieveUpdateDestroyView, MissionOrderCreateView, MissionOrderRetrieveUpdateDestroyView, \
-    MissionApprovalCreateView, MissionApprovalUpdateView
+    StaffRetrieveUpdateDestroyView, MissionOrderListCreateView, MissionOrderBulkCreateView, MissionOrderExportView, \
+    MissionOrderRetrieveUpdateDestroyView, MissionAttachmentUploadCreateView, MissionAttachmentUploadView, \
+    MissionAttachmentDownloadView, ApprovalDecisionView, ApprovalInboxView, MissionStatisticsView, StaffSearchView, \
+    MissionOrderSearchView, UnitAwayView, VehicleViewSet, DriverViewSet, VehicleAvailabilityView, \
+    MissionOrderBookingView, PoolingProposalListView, PoolingProposalAcceptView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
 router.register(r'campuses', CampusViewSet)
 router.register(r'colleges', CollegeViewSet)
+router.register(r'vehicles', VehicleViewSet)
+router.register(r'drivers', DriverViewSet)
 
 urlpatterns = [
     path('units/', UnitCreateView.as_view(), name='unit-create'),
     path('units/<int:pk>/', UnitRetrieveUpdateDestroyView.as_view(), name='unit-detail'),
+    path('units/<int:pk>/away/', UnitAwayView.as_view(), name='unit-away'),
+
+    path('vehicles/available/', VehicleAvailabilityView.as_view(), name='vehicle-available'),
+    path('vehicles/pooling/', PoolingProposalListView.as_view(), name='pooling-proposal-list'),
+    path('vehicles/pooling/<int:pk>/accept/', PoolingProposalAcceptView.as_view(), name='pooling-proposal-accept'),
 
     path('departments/', DepartmentCreateView.as_view(), name='department-create'),
     path('departments/<int:pk>/', DepartmentRetrieveUpdateDestroyView.as_view(), name='department-detail'),
     path('staff/', StaffCreateView.as_view(), name='staff-create'),
     path('staff/<int:pk>/', StaffRetrieveUpdateDestroyView.as_view(), name='staff-detail'),
 
-    path('missions-orders/', MissionOrderCreateView.as_view(), name='mission-order-create'),
+    path('missions-orders/', MissionOrderListCreateView.as_view(), name='mission-order-list-create'),
+    path('missions-orders/bulk/', MissionOrderBulkCreateView.as_view(), name='mission-order-bulk-create'),
+    path('missions-orders/export/', MissionOrderExportView.as_view(), name='mission-order-export'),
     path('missions-orders/<int:pk>/', MissionOrderRetrieveUpdateDestroyView.as_view(), name='mission-order-detail'),
+    path('missions-orders/<int:pk>/booking/', MissionOrderBookingView.as_view(), name='mission-order-booking'),
+    path('missions-orders/<int:pk>/uploads/', MissionAttachmentUploadCreateView.as_view(),
+         name='mission-attachment-upload-create'),
+    path('missions-uploads/<uuid:pk>/', MissionAttachmentUploadView.as_view(), name='mission-attachment-upload'),
+    path('missions-attachments/<int:pk>/download/', MissionAttachmentDownloadView.as_view(),
+         name='mission-attachment-download'),
+
+    path('missions-approvals/<int:pk>/approve/', ApprovalDecisionView.as_view(decision=ApprovalStatusChoices.APPROVED),
+         name='mission-approval-approve'),
+    path('missions-approvals/<int:pk>/reject/', ApprovalDecisionView.as_view(decision=ApprovalStatusChoices.REJECTED),
+         name='mission-approval-reject'),
+    path('missions-approvals/inbox/', ApprovalInboxView.as_view(), name='mission-approval-inbox'),
+
+    path('search/staff/', StaffSearchView.as_view(), name='staff-search'),
+    path('search/missions-orders/', MissionOrderSearchView.as_view(), name='mission-order-search'),
 
-    path('missions-approvals/', MissionApprovalCreateView.as_view(), name='mission-approval-create'),
-    path('missions-approvals/<int:pk>/', MissionApprovalUpdateView.as_view(), name='mission-approval-update'),
+    path('missions-statistics/', MissionStatisticsView.as_view(), name='mission-statistics'),
 
 
 ] + router.urls
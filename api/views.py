@@ -1,56 +1,106 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Sum, Q
+from django.http import StreamingHttpResponse, HttpResponse, FileResponse
+from django.utils.http import content_disposition_header
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
 from rest_framework import viewsets
 from rest_framework.permissions import BasePermission, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import exception_handler
 
+from accounts.authentication import ClaimsUser
+from accounts.groups import in_groups
 from accounts.models import CustomUser
-from core.models import College, Unit, Department, Campus, Staff, MissionOrder, Approval
+from api.caching import CachedReadMixin, ConditionalRetrieveMixin
+from api.filters import MissionOrderFilter, MissionStatisticFilter, VehicleFilter
+from api.pagination import CreatedCursorPagination, ApprovalInboxPagination, SearchPagination
+from core.exports import iter_mission_orders_csv
+from core.models import College, Unit, Department, Campus, Staff, MissionOrder, Approval, ApprovalStatusChoices, \
+    MissionStatistic, MissionAttachment, UploadSession, Vehicle, Driver, PoolingProposal
+from core.fleet import available_vehicles, book, release
+from core.overlaps import overlapping_missions
+from core.pooling import pooling_candidates
+from core.search import search_staff, search_missions
+from core.uploads import parse_content_range, start_upload, write_chunk
+from core.workflow import decide
 from api.serializers import CollegeSerializer, UnitReadSerializer, DepartmentReadSerializer, CampusSerializer, \
-    StaffReadSerializer, \
+    StaffReadSerializer, setup_eager_loading, \
     UserSerializer, UnitWriteSerializer, DepartmentWriteSerializer, StaffWriteSerializer, MissionOrderReadSerializer, \
-    MissionOrderWriteSerializer, MissionOrderApprovalSerializer
+    MissionOrderWriteSerializer, MissionOrderApprovalSerializer, ApprovalReadSerializer, \
+    MissionOrderBulkWriteSerializer, ApprovalDecisionSerializer, MissionOrderAttachmentSerializer, \
+    UploadSessionSerializer, PeriodSerializer, VehicleSerializer, DriverSerializer, VehicleBookingSerializer, \
+    PoolingProposalSerializer
 
 
 class IsUnitManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Unit Manager').exists()
+        return in_groups(request.user, 'Unit Manager')
 
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Admin').exists()
+        return in_groups(request.user, 'Admin')
 
 
 class IsCampusManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Campus Manager').exists()
+        return in_groups(request.user, 'Campus Manager')
 
 
 class IsSuperuser(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Superuser').exists()
+        return in_groups(request.user, 'Superuser')
 
 
 class IsSuperuserOrAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name__in=['Superuser', 'Admin']).exists()
+        return in_groups(request.user, 'Superuser', 'Admin')
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class IsMissionOwnerOrAdmin(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return obj.staff.user_id == request.user.pk or in_groups(request.user, 'Superuser', 'Admin')
+
+
+def get_staff_id(user):
+    """The staff id of ``user``, read from the token claims when the request was authenticated statelessly."""
+    if isinstance(user, ClaimsUser):
+        return user.staff_id
+    return Staff.objects.filter(user_id=user.pk).values_list('id', flat=True).first()
+
+
+class EagerLoadingMixin:
+    """Join and prefetch whatever the read serializer of the view needs to render its objects."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = setup_eager_loading(self.get_serializer(), queryset)
+        return queryset
+
+
+class UserViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated & IsSuperuserOrAdmin]
 
 
-class CollegeViewSet(viewsets.ModelViewSet):
+class CollegeViewSet(CachedReadMixin, viewsets.ModelViewSet):
     queryset = College.objects.all()
+    cache_models = (College,)
     serializer_class = CollegeSerializer
     permission_classes = [IsAuthenticated]
 
 
-class UnitRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class UnitRetrieveUpdateDestroyView(CachedReadMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Unit.objects.all()
+    cache_models = (Unit, College)
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -65,8 +115,9 @@ class UnitCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated & IsUnitManager & IsAdmin]
 
 
-class DepartmentRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class DepartmentRetrieveUpdateDestroyView(CachedReadMixin, EagerLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Department.objects.all()
+    cache_models = (Department, Unit, College)
     permission_classes = [IsAuthenticated & IsSuperuser]
 
     def get_serializer_class(self):
@@ -82,13 +133,46 @@ class DepartmentCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated & IsUnitManager & IsSuperuser]
 
 
-class CampusViewSet(viewsets.ModelViewSet):
+class CampusViewSet(CachedReadMixin, viewsets.ModelViewSet):
     queryset = Campus.objects.all()
+    cache_models = (Campus,)
     serializer_class = CampusSerializer
     permission_classes = [IsAuthenticated & IsSuperuser]
 
 
-class StaffRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class VehicleViewSet(viewsets.ModelViewSet):
+    queryset = Vehicle.objects.all()
+    serializer_class = VehicleSerializer
+    permission_classes = [IsAuthenticated & (IsCampusManager | IsSuperuserOrAdmin)]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = VehicleFilter
+
+
+class DriverViewSet(viewsets.ModelViewSet):
+    queryset = Driver.objects.all()
+    serializer_class = DriverSerializer
+    permission_classes = [IsAuthenticated & (IsCampusManager | IsSuperuserOrAdmin)]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ('campus', 'active')
+
+
+class VehicleAvailabilityView(generics.ListAPIView):
+    """Active vehicles with no booking on any day from ``start`` to ``end``, or on ``date``."""
+    queryset = Vehicle.objects.all()
+    serializer_class = VehicleSerializer
+    permission_classes = [IsAuthenticated & (IsCampusManager | IsSuperuserOrAdmin)]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = VehicleFilter
+
+    def get_queryset(self):
+        period = PeriodSerializer(data=self.request.query_params)
+        period.is_valid(raise_exception=True)
+        return available_vehicles(super().get_queryset(), period.validated_data['start'],
+                                  period.validated_data['end']).order_by('plate_number')
+
+
+class StaffRetrieveUpdateDestroyView(ConditionalRetrieveMixin, EagerLoadingMixin,
+                                     generics.RetrieveUpdateDestroyAPIView):
     queryset = Staff.objects.all()
     permission_classes = [IsAuthenticated]
 
@@ -105,7 +189,8 @@ class StaffCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated & (IsUnitManager & IsSuperuserOrAdmin)]
 
 
-class MissionOrderRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class MissionOrderRetrieveUpdateDestroyView(ConditionalRetrieveMixin, EagerLoadingMixin,
+                                            generics.RetrieveUpdateDestroyAPIView):
     queryset = MissionOrder.objects.all()
     serializer_class = MissionOrderReadSerializer
     permission_classes = [IsAuthenticated]
@@ -117,10 +202,18 @@ class MissionOrderRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIVie
             return MissionOrderWriteSerializer
 
 
-class MissionOrderCreateView(generics.CreateAPIView):
+class MissionOrderListCreateView(EagerLoadingMixin, generics.ListCreateAPIView):
     queryset = MissionOrder.objects.all()
-    serializer_class = MissionOrderWriteSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MissionOrderFilter
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return MissionOrderReadSerializer
+        else:
+            return MissionOrderWriteSerializer
 
     def create(self, request, *args, **kwargs):
         data = request.data
@@ -132,13 +225,272 @@ class MissionOrderCreateView(generics.CreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class MissionApprovalCreateView(generics.CreateAPIView):
-    queryset = Approval.objects.all()
-    serializer_class = MissionOrderApprovalSerializer
-    permission_classes = [IsAuthenticated & (IsUnitManager | IsCampusManager, IsSuperuserOrAdmin)]
+class MissionOrderBulkCreateView(generics.CreateAPIView):
+    queryset = MissionOrder.objects.all()
+    serializer_class = MissionOrderBulkWriteSerializer
+    permission_classes = [IsAuthenticated & (IsUnitManager | IsSuperuserOrAdmin)]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        missions = serializer.save()
+        read_serializer = MissionOrderReadSerializer(context=self.get_serializer_context())
+        queryset = setup_eager_loading(read_serializer, self.get_queryset().filter(pk__in=[m.pk for m in missions]))
+        read_serializer = MissionOrderReadSerializer(queryset, many=True, context=self.get_serializer_context())
+        return Response(read_serializer.data, status=status.HTTP_201_CREATED)
+
+
+class MissionOrderExportView(generics.GenericAPIView):
+    queryset = MissionOrder.objects.all()
+    permission_classes = [IsAuthenticated & IsSuperuserOrAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MissionOrderFilter
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(iter_mission_orders_csv(self.filter_queryset(self.get_queryset())),
+                                         content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="mission-orders.csv"'
+        return response
+
+
+class MissionAttachmentUploadCreateView(generics.GenericAPIView):
+    """Start a resumable upload of an attachment of the mission; its chunks are then PUT to the upload."""
+    queryset = MissionOrder.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated & IsMissionOwnerOrAdmin]
+
+    def post(self, request, *args, **kwargs):
+        mission_order = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = start_upload(mission_order, request.user, **serializer.validated_data)
+        location = reverse('mission-attachment-upload', kwargs={'pk': session.pk}, request=request)
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED,
+                        headers={'Location': location})
+
+
+class MissionAttachmentUploadView(generics.RetrieveDestroyAPIView):
+    """
+    GET tells the offset to resume from, PUT appends the chunk given by its ``Content-Range``, streamed to disk,
+    DELETE abandons the upload. The chunk completing the upload returns the created attachment; sending it again
+    retries the completion, should it have failed.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(owner_id=self.request.user.pk)
+
+    def put(self, request, *args, **kwargs):
+        session = self.get_object()
+        start, end, total = parse_content_range(request.headers.get('Content-Range'))
+        length = end - start + 1
+        if total != session.size or length != int(request.META.get('CONTENT_LENGTH') or 0):
+            return Response({'detail': 'The Content-Range does not match the upload or the Content-Length.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        result = write_chunk(session, start, request.stream, length)
+        if isinstance(result, MissionAttachment):
+            return Response(MissionOrderAttachmentSerializer(result, context=self.get_serializer_context()).data,
+                            status=status.HTTP_201_CREATED)
+        return Response(self.get_serializer(result).data)
+
+
+class MissionAttachmentDownloadView(generics.RetrieveAPIView):
+    """
+    Download an attachment of a mission the user can see: their own, one they approve or approved, one of the unit
+    they manage, or any for superusers and admins.
+
+    With ATTACHMENT_X_ACCEL_PREFIX set, the response only tells nginx which file to send, freeing the worker.
+    """
+    queryset = MissionAttachment.objects.all()
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if in_groups(self.request.user, 'Superuser', 'Admin'):
+            return queryset
+        user_id = self.request.user.pk
+        visible = MissionOrder.objects.filter(
+            Q(staff__user_id=user_id) | Q(approvals__approver__user_id=user_id) | Q(unit__manager__user_id=user_id))
+        return queryset.filter(mission_order__in=visible.values('pk'))
+
+    def retrieve(self, request, *args, **kwargs):
+        attachment = self.get_object()
+        filename = attachment.original_name or os.path.basename(attachment.attachment.name)
+        content_type = attachment.content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if settings.ATTACHMENT_X_ACCEL_PREFIX:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = quote(settings.ATTACHMENT_X_ACCEL_PREFIX + attachment.attachment.name)
+            response['Content-Disposition'] = content_disposition_header(True, filename)
+            return response
+        return FileResponse(attachment.attachment.open('rb'), as_attachment=True, filename=filename,
+                            content_type=content_type)
+
+
+class MissionOrderBookingView(generics.GenericAPIView):
+    """
+    POST books a vehicle and driver for the provided transportation of the mission, over its dates, replacing any
+    previous booking; 409 if either is already booked. DELETE cancels the booking.
+    """
+    queryset = MissionOrder.objects.select_related('transportation')
+    serializer_class = VehicleBookingSerializer
+    permission_classes = [IsAuthenticated & (IsCampusManager | IsSuperuserOrAdmin)]
+
+    def post(self, request, *args, **kwargs):
+        mission_order = self.get_object()
+        if mission_order.status == ApprovalStatusChoices.REJECTED:
+            return Response({'detail': 'A rejected mission cannot be booked a vehicle.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        booking = book([mission_order.transportation], serializer.validated_data['vehicle'],
+                       serializer.validated_data['driver'], mission_order.departure_date, mission_order.returning_date)
+        return Response(self.get_serializer(booking).data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, *args, **kwargs):
+        mission_order = self.get_object()
+        release([mission_order.transportation_id])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class PoolingProposalListView(generics.ListAPIView):
+    """The shared vehicles proposed by propose_pools and not accepted yet, soonest first."""
+    queryset = PoolingProposal.objects.filter(booking__isnull=True).prefetch_related('missions')
+    serializer_class = PoolingProposalSerializer
+    permission_classes = [IsAuthenticated & (IsCampusManager | IsSuperuserOrAdmin)]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ('campus', 'destination')
 
+    def get_queryset(self):
+        return super().get_queryset().order_by('start_date', 'pk')
 
-class MissionApprovalUpdateView(generics.UpdateAPIView):
+
+class PoolingProposalAcceptView(generics.GenericAPIView):
+    """Book one vehicle and driver for the missions of the proposal still eligible; 409 if either is taken."""
+    queryset = PoolingProposal.objects.filter(booking__isnull=True)
+    serializer_class = VehicleBookingSerializer
+    permission_classes = [IsAuthenticated & (IsCampusManager | IsSuperuserOrAdmin)]
+
+    def post(self, request, *args, **kwargs):
+        proposal = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Missions rejected, moved or booked together with others since the proposal no longer belong to it.
+        missions = list(pooling_candidates().filter(
+            pk__in=proposal.missions.values('pk'), departure_date__gte=proposal.start_date,
+            returning_date__lte=proposal.end_date,
+        ).select_related('transportation'))
+        if len(missions) < 2:
+            return Response({'detail': 'Fewer than two missions of this proposal can still share a vehicle.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        booking = book([mission.transportation for mission in missions], serializer.validated_data['vehicle'],
+                       serializer.validated_data['driver'], min(mission.departure_date for mission in missions),
+                       max(mission.returning_date for mission in missions))
+        proposal.booking = booking
+        proposal.save(update_fields=['booking', 'modified'])
+        proposal.missions.set(missions)
+        return Response(PoolingProposalSerializer(proposal, context=self.get_serializer_context()).data)
+
+
+class ApprovalDecisionView(generics.GenericAPIView):
+    """Approve or reject, as given by ``decision``, one of the requesting user's approvals; 409 if already decided."""
     queryset = Approval.objects.all()
-    serializer_class = MissionOrderApprovalSerializer
-    permission_classes = [IsAuthenticated & (IsAdmin | IsCampusManager | IsUnitManager | IsSuperuserOrAdmin)]
+    serializer_class = ApprovalDecisionSerializer
+    permission_classes = [IsAuthenticated]
+    decision = ApprovalStatusChoices.APPROVED
+
+    def get_queryset(self):
+        return super().get_queryset().filter(approver__user_id=self.request.user.pk)
+
+    def post(self, request, *args, **kwargs):
+        approval = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        decide(approval, self.decision, **serializer.validated_data)
+        return Response(MissionOrderApprovalSerializer(approval).data)
+
+
+class ApprovalInboxView(EagerLoadingMixin, generics.ListAPIView):
+    queryset = Approval.objects.filter(status=ApprovalStatusChoices.PENDING)
+    serializer_class = ApprovalReadSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ApprovalInboxPagination
+
+    def get_queryset(self):
+        # On approver_id rather than through the staff table, so the inbox is one range scan of approval_inbox_idx.
+        staff_id = get_staff_id(self.request.user)
+        if staff_id is None:
+            return super().get_queryset().none()
+        return super().get_queryset().filter(approver_id=staff_id)
+
+
+class UnitAwayView(EagerLoadingMixin, generics.ListAPIView):
+    """Missions, not rejected, of the unit running on ``date``, or on any day from ``start`` to ``end``."""
+    queryset = MissionOrder.objects.all()
+    serializer_class = MissionOrderReadSerializer
+    permission_classes = [IsAuthenticated & (IsUnitManager | IsCampusManager | IsSuperuserOrAdmin)]
+
+    def get_queryset(self):
+        period = PeriodSerializer(data=self.request.query_params)
+        period.is_valid(raise_exception=True)
+        queryset = super().get_queryset().filter(unit_id=self.kwargs['pk'])
+        return overlapping_missions(queryset, period.validated_data['start'],
+                                    period.validated_data['end']).order_by('departure_date', 'pk')
+
+
+class StaffSearchView(EagerLoadingMixin, generics.ListAPIView):
+    """Staff matching ``q`` by name, even misspelled, email or phone number, best matches first."""
+    queryset = Staff.objects.all()
+    serializer_class = StaffReadSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        return search_staff(super().get_queryset(), self.request.query_params.get('q', ''))
+
+
+class MissionOrderSearchView(EagerLoadingMixin, generics.ListAPIView):
+    """
+    Missions whose purpose, expected results or destination match ``q``, best matches first, narrowed down by the
+    mission order filters.
+    """
+    queryset = MissionOrder.objects.all()
+    serializer_class = MissionOrderReadSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MissionOrderFilter
+
+    def get_queryset(self):
+        return search_missions(super().get_queryset(), self.request.query_params.get('q', ''))
+
+
+class MissionStatisticsView(generics.ListAPIView):
+    """
+    Mission totals from the summary table, grouped by the comma separated ``group_by`` dimensions:
+    unit, college, destination and month.
+    """
+    queryset = MissionStatistic.objects.all()
+    permission_classes = [IsAuthenticated & (IsUnitManager | IsCampusManager | IsSuperuserOrAdmin)]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MissionStatisticFilter
+    group_by_fields = {'unit': 'unit', 'college': 'unit__college', 'destination': 'destination', 'month': 'month'}
+
+    def list(self, request, *args, **kwargs):
+        group_by = [name for name in request.query_params.get('group_by', 'unit').split(',') if name]
+        unknown = set(group_by) - self.group_by_fields.keys()
+        if unknown:
+            return Response({'group_by': [f"Unknown dimension(s): {', '.join(sorted(unknown))}."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        lookups = [self.group_by_fields[name] for name in group_by]
+        totals = self.filter_queryset(self.get_queryset()).values(*lookups).annotate(
+            total_missions=Sum('mission_count'), total_days=Sum('mission_days'),
+            total_approved=Sum('approved_count'), total_rejected=Sum('rejected_count'),
+        ).order_by(*lookups)
+        return Response([
+            {**{name: row[self.group_by_fields[name]] for name in group_by},
+             'mission_count': row['total_missions'], 'mission_days': row['total_days'],
+             'approved_count': row['total_approved'], 'rejected_count': row['total_rejected']}
+            for row in totals
+        ])
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from core.models import College, Unit, Department, Staff
+from core.models import College, Unit, Department, Staff, Notification, Vehicle, Driver, VehicleBooking, \
+    PoolingProposal, MissionRate
+from core.search import search_staff
 
 
 @admin.register(College)
@@ -27,6 +29,53 @@ class DepartmentAdmin(admin.ModelAdmin):
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
     list_display = ['user', 'first_name', 'last_name', 'gender', 'type', 'unit', 'campus', 'phone_number']
-    search_fields = ['user', 'first_name', 'last_name', 'user__email']
+    search_fields = ['first_name', 'last_name', 'user__email', 'phone_number']
     list_filter = ['gender', 'type', 'unit', 'campus']
 
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed full-text search instead of icontains scans, see core.search.
+        if not search_term:
+            return queryset, False
+        return search_staff(queryset, search_term), False
+
+
+@admin.register(Vehicle)
+class VehicleAdmin(admin.ModelAdmin):
+    list_display = ['plate_number', 'description', 'seats', 'campus', 'active']
+    search_fields = ['plate_number', 'description']
+    list_filter = ['campus', 'active']
+
+
+@admin.register(Driver)
+class DriverAdmin(admin.ModelAdmin):
+    list_display = ['name', 'phone_number', 'campus', 'active']
+    search_fields = ['name', 'phone_number']
+    list_filter = ['campus', 'active']
+
+
+@admin.register(VehicleBooking)
+class VehicleBookingAdmin(admin.ModelAdmin):
+    list_display = ['vehicle', 'driver', 'start_date', 'end_date']
+    list_filter = ['vehicle', 'driver']
+    date_hierarchy = 'start_date'
+
+
+@admin.register(PoolingProposal)
+class PoolingProposalAdmin(admin.ModelAdmin):
+    list_display = ['campus', 'destination', 'start_date', 'end_date', 'booking']
+    list_filter = ['campus', 'destination']
+    date_hierarchy = 'start_date'
+
+
+@admin.register(MissionRate)
+class MissionRateAdmin(admin.ModelAdmin):
+    list_display = ['role', 'destination', 'min_distance_km', 'effective_date', 'daily_allowance',
+                    'night_allowance', 'km_allowance']
+    list_filter = ['role', 'destination', 'effective_date']
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['channel', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    search_fields = ['recipient', 'subject']
+    list_filter = ['channel', 'status']
@@ -1,6 +1,34 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def restore_search_triggers(sender, using, **kwargs):
+    from core.search import restore_sqlite_search_triggers
+
+    db_connection = connections[using]
+    if db_connection.vendor == 'sqlite' and 'core_staff_fts' in db_connection.introspection.table_names():
+        restore_sqlite_search_triggers(db_connection)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [checks.Warning(
+        'The default cache is local to each process, so invalidations made by one worker or management command '
+        'never reach the others.',
+        hint='Point CACHES to Redis or Memcached, shared by every process, see missions/settings/prod.py.',
+        id='core.W001',
+    )]
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # SQLite migrations rebuild tables to alter them, dropping the search triggers, see core.search.
+        post_migrate.connect(restore_search_triggers, sender=self, dispatch_uid='restore_search_triggers')
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
@@ -0,0 +1,98 @@
+"""
+Mission costs from the rate tables.
+
+A rate applies to a role, a destination (blank for any destination without its own rate) and the distances from
+``min_distance_km`` up to the next band, from its ``effective_date`` until the next version of it. The whole table
+is loaded once into an index, cached like the approval routing and rebuilt when a rate changes:
+
+    {(role, destination): (band lower bounds, [(effective dates, rates) per band])}
+
+so pricing a mission takes two binary searches and no query.
+"""
+import bisect
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+
+RATE_INDEX_CACHE_KEY = 'core:mission_rates'
+RATE_INDEX_CACHE_TIMEOUT = 60 * 60
+CENTS = Decimal('0.01')
+
+
+def build_rate_index():
+    from core.models import MissionRate
+
+    versions = defaultdict(lambda: defaultdict(list))
+    rates = MissionRate.objects.order_by('effective_date').values_list(
+        'role', 'destination', 'min_distance_km', 'effective_date', 'daily_allowance', 'night_allowance',
+        'km_allowance')
+    for role, destination, min_distance_km, effective_date, *allowances in rates:
+        versions[role, destination][min_distance_km].append((effective_date, tuple(allowances)))
+    index = {}
+    for key, bands in versions.items():
+        bounds = sorted(bands)
+        index[key] = (bounds, [([date for date, _ in bands[bound]], [rate for _, rate in bands[bound]])
+                               for bound in bounds])
+    return index
+
+
+def get_rate_index():
+    index = cache.get(RATE_INDEX_CACHE_KEY)
+    if index is None:
+        index = build_rate_index()
+        cache.set(RATE_INDEX_CACHE_KEY, index, RATE_INDEX_CACHE_TIMEOUT)
+    return index
+
+
+def invalidate_rate_index():
+    # Deleting before the rate commits would let another request cache the index without it until the timeout.
+    transaction.on_commit(lambda: cache.delete(RATE_INDEX_CACHE_KEY))
+
+
+def find_rate(index, role, destination, distance_km, date):
+    """Return the ``(daily, night, km)`` allowances in force on ``date``, or None when no rate applies."""
+    for key in ((role, destination), (role, '')):
+        if key not in index:
+            continue
+        bounds, bands = index[key]
+        band = bisect.bisect_right(bounds, distance_km or 0) - 1
+        if band < 0:
+            continue
+        dates, rates = bands[band]
+        version = bisect.bisect_right(dates, date) - 1
+        if version >= 0:
+            return rates[version]
+    return None
+
+
+def price(rate, duration_days, duration_nights, distance_km):
+    if rate is None:
+        return None
+    daily, night, km = rate
+    return (daily * duration_days + night * max(duration_nights, 0) + km * (distance_km or 0)).quantize(CENTS)
+
+
+def price_mission(index, mission):
+    rate = find_rate(index, mission.role, mission.destination, mission.distance_km, mission.departure_date)
+    return price(rate, mission.duration_days, mission.duration_nights, mission.distance_km)
+
+
+def price_missions(missions, index=None):
+    """
+    Price many missions in one pass: ``missions`` are ``(role, destination, distance_km, departure_date,
+    duration_days, duration_nights)`` tuples, the costs come back in the same order.
+
+    Missions on the same role, destination, distance and date share their rate lookup.
+    """
+    if index is None:
+        index = get_rate_index()
+    rates = {}
+    costs = []
+    for role, destination, distance_km, departure_date, duration_days, duration_nights in missions:
+        key = (role, destination, distance_km, departure_date)
+        if key not in rates:
+            rates[key] = find_rate(index, *key)
+        costs.append(price(rates[key], duration_days, duration_nights, distance_km))
+    return costs
@@ -0,0 +1,39 @@
+import csv
+
+MISSION_ORDER_EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('staff__user__email', 'staff_email'),
+    ('staff__first_name', 'first_name'),
+    ('staff__last_name', 'last_name'),
+    ('unit__short_name', 'unit'),
+    ('unit__college__short_name', 'college'),
+    ('role', 'role'),
+    ('destination', 'destination'),
+    ('distance_km', 'distance_km'),
+    ('departure_date', 'departure_date'),
+    ('returning_date', 'returning_date'),
+    ('duration_days', 'duration_days'),
+    ('duration_nights', 'duration_nights'),
+    ('transportation__transportation_means', 'transportation_means'),
+    ('cost', 'cost'),
+)
+
+
+class Echo:
+    """A file-like object whose ``write`` hands the value back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def iter_mission_order_rows(queryset, chunk_size=2000):
+    """Yield the export header and then one tuple per mission, reading the database in chunks."""
+    yield tuple(header for _, header in MISSION_ORDER_EXPORT_COLUMNS)
+    lookups = [lookup for lookup, _ in MISSION_ORDER_EXPORT_COLUMNS]
+    yield from queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def iter_mission_orders_csv(queryset, chunk_size=2000):
+    writer = csv.writer(Echo())
+    for row in iter_mission_order_rows(queryset, chunk_size):
+        yield writer.writerow(row)
@@ -0,0 +1,105 @@
+"""
+Bookings of the university vehicles and drivers for PROVIDED transportation.
+
+A booking reserves a vehicle and a driver over a date range; several transportations, of missions travelling
+together, can share one. Neither a vehicle nor a driver can be booked twice on the same day:
+
+- on PostgreSQL, exclusion constraints over ``daterange(start_date, end_date)`` reject double bookings whatever
+  the write path, and their GiST indexes answer the availability queries,
+- elsewhere, booking locks the vehicle and driver rows before looking for overlaps, and the (vehicle, end_date)
+  and (driver, end_date) indexes narrow the scan down to the bookings still running at the start of the range.
+
+Migration 0016_fleet creates the constraints.
+"""
+from django.db import connection, transaction, IntegrityError
+from django.db.models import DateField, Exists, OuterRef, Q, Value
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.overlaps import DateRangeOverlaps
+
+
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The vehicle or the driver is already booked on some of these dates.'
+    default_code = 'booking_conflict'
+
+
+def overlapping_bookings(queryset, start, end):
+    """Filter ``queryset`` to the bookings running on any day from ``start`` to ``end`` included."""
+    if connection.vendor == 'postgresql':
+        return queryset.filter(DateRangeOverlaps('start_date', 'end_date', Value(start, output_field=DateField()),
+                                                 Value(end, output_field=DateField())))
+    return queryset.filter(end_date__gte=start, start_date__lte=end)
+
+
+def available_vehicles(queryset, start, end):
+    """Filter ``queryset`` to the active vehicles free from ``start`` to ``end`` included, in a single query."""
+    from core.models import VehicleBooking
+
+    booked = overlapping_bookings(VehicleBooking.objects.filter(vehicle=OuterRef('pk')), start, end)
+    return queryset.filter(~Exists(booked), active=True)
+
+
+def release(transportation_ids):
+    """Cancel the bookings of the given transportations, deleting the bookings no other transportation shares."""
+    from core.models import Transportation, VehicleBooking
+
+    booked = Transportation.objects.filter(pk__in=transportation_ids, booking__isnull=False)
+    booking_ids = set(booked.values_list('booking_id', flat=True))
+    if not booking_ids:
+        return
+    booked.update(booking=None, vehicle_identification=None, driver_name=None, modified=timezone.now())
+    VehicleBooking.objects.filter(pk__in=booking_ids, transportations__isnull=True).delete()
+
+
+@transaction.atomic
+def book(transportations, vehicle, driver, start_date, end_date):
+    """
+    Book ``vehicle`` and ``driver`` from ``start_date`` to ``end_date`` for the PROVIDED ``transportations``,
+    replacing their previous bookings. Raises BookingConflict when either is already booked on one of the days.
+
+    The vehicle and the driver must be of the campus the missions leave from, that of their staff members, and the
+    vehicle must seat every one of them.
+    """
+    from core.models import Driver, MissionOrder, Transportation, TransportationChoices, Vehicle, VehicleBooking
+
+    if start_date > end_date:
+        raise ValidationError('A booking cannot end before it starts.')
+    if any(t.transportation_means != TransportationChoices.PROVIDED for t in transportations):
+        raise ValidationError('Only provided transportation can be booked on a university vehicle.')
+    if not vehicle.active or not driver.active:
+        raise ValidationError('The vehicle and the driver must be active.')
+    transportation_ids = [t.pk for t in transportations]
+    campus_ids = list(MissionOrder.objects.filter(transportation_id__in=transportation_ids).values_list(
+        'staff__campus_id', flat=True))
+    if set(campus_ids) - {vehicle.campus_id} or driver.campus_id != vehicle.campus_id:
+        raise ValidationError('The vehicle and the driver must be of the campus the missions leave from.')
+    if len(campus_ids) > vehicle.seats:
+        raise ValidationError(f'The vehicle seats {vehicle.seats}, not the {len(campus_ids)} staff travelling.')
+    release(transportation_ids)
+
+    # Locked so concurrent bookings of the same vehicle or driver look for overlaps one after the other.
+    Vehicle.objects.select_for_update().get(pk=vehicle.pk)
+    Driver.objects.select_for_update().get(pk=driver.pk)
+    if overlapping_bookings(VehicleBooking.objects.filter(Q(vehicle=vehicle) | Q(driver=driver)),
+                            start_date, end_date).exists():
+        raise BookingConflict()
+    try:
+        with transaction.atomic():
+            booking = VehicleBooking.objects.create(vehicle=vehicle, driver=driver, start_date=start_date,
+                                                    end_date=end_date)
+    except IntegrityError:
+        # A concurrent booking won the exclusion constraint.
+        raise BookingConflict()
+
+    # The free text fields stay filled in for the mission order documents.
+    Transportation.objects.filter(pk__in=transportation_ids).update(
+        booking=booking, vehicle_identification=vehicle.plate_number, driver_name=driver.name,
+        modified=timezone.now())
+    for transportation in transportations:
+        transportation.booking = booking
+        transportation.vehicle_identification = vehicle.plate_number
+        transportation.driver_name = driver.name
+    return booking
@@ -0,0 +1,38 @@
+import csv
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from core.exports import iter_mission_order_rows
+from core.models import MissionOrder
+
+
+class Command(BaseCommand):
+    help = 'Exports mission orders to CSV for per-diem reconciliation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat,
+                            help='Only export missions departing on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat,
+                            help='Only export missions departing on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--output', help='File to write to, defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = MissionOrder.objects.all()
+        if options['date_from']:
+            queryset = queryset.filter(departure_date__gte=options['date_from'])
+        if options['date_to']:
+            queryset = queryset.filter(departure_date__lte=options['date_to'])
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output)
+            count = -1
+            for count, row in enumerate(iter_mission_order_rows(queryset, options['chunk_size'])):
+                writer.writerow(row)
+        finally:
+            if options['output']:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(f'Exported {count} mission orders'))
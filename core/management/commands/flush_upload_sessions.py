@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Deletes the unfinished attachment uploads idle for longer than UPLOAD_SESSION_TIMEOUT, and their files'
+
+    def handle(self, *args, **options):
+        idle = UploadSession.objects.filter(modified__lt=timezone.now() - settings.UPLOAD_SESSION_TIMEOUT)
+        deleted, _ = idle.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} idle uploads'))
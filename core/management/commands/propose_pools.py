@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.pooling import propose_pools
+
+
+class Command(BaseCommand):
+    help = ('Proposes shared vehicles for the upcoming missions from the same campus to the same destination on '
+            'common dates, replacing the proposals not accepted yet. Meant to run nightly')
+
+    def handle(self, *args, **options):
+        proposals = propose_pools()
+        self.stdout.write(self.style.SUCCESS(f'Proposed {len(proposals)} shared vehicles'))
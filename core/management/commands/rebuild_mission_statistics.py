@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.statistics import rebuild_mission_statistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the mission statistics summary table from the mission orders and approvals'
+
+    def handle(self, *args, **options):
+        rows = rebuild_mission_statistics()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} mission statistics rows'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.costs import get_rate_index, price_missions
+from core.models import MissionOrder
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the stored cost of the missions from the current rate tables, e.g. after adding rates '
+            'effective in the past')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=parse_date, help='Only the missions departing on or after this date')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        missions = MissionOrder.objects.order_by('pk')
+        if options['since']:
+            missions = missions.filter(departure_date__gte=options['since'])
+        rate_index = get_rate_index()
+        batch_size = options['batch_size']
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(missions.filter(pk__gt=last_pk).only(
+                'pk', 'role', 'destination', 'distance_km', 'departure_date', 'duration_days', 'duration_nights',
+                'cost')[:batch_size])
+            if not batch:
+                break
+            costs = price_missions([(mission.role, mission.destination, mission.distance_km,
+                                     mission.departure_date, mission.duration_days, mission.duration_nights)
+                                    for mission in batch], rate_index)
+            changed = []
+            now = timezone.now()
+            for mission, cost in zip(batch, costs):
+                if mission.cost != cost:
+                    mission.cost = cost
+                    mission.modified = now
+                    changed.append(mission)
+            # bulk_update skips save() and its signals, the statistics do not depend on the cost. It also skips
+            # auto_now, hence modified set above: the ETags and Last-Modified of the missions are built from it.
+            MissionOrder.objects.bulk_update(changed, ['cost', 'modified'])
+            updated += len(changed)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Repriced {updated} missions'))
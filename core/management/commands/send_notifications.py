@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import send_notifications
+
+
+class Command(BaseCommand):
+    help = 'Sends the queued approval notifications, retrying the failed ones with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to wait when there is nothing to send')
+        parser.add_argument('--once', action='store_true', help='Drain the due notifications and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            notifications = send_notifications(batch_size=options['batch_size'])
+            if notifications:
+                sent = sum(notification.sent_at is not None for notification in notifications)
+                self.stdout.write(f'{sent} sent, {len(notifications) - sent} failed')
+            if len(notifications) < options['batch_size']:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_alter_approval_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approval',
+            index=models.Index(fields=['approver', 'status', 'created'], name='approval_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_approval_inbox_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MissionStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(choices=[('KIGALI', 'Kigali'), ('HUYE', 'Huye'), ('MUSANZE', 'Musanze'), ('RUBAVU', 'Rubavu'), ('NYAGATARE', 'Nyagatare'), ('RUSIZI', 'Rusizi'), ('KARONGI', 'Karongi'), ('NYANZA', 'Nyanza'), ('GAKENKE', 'Gakenke'), ('NGORORERO', 'Ngororero'), ('KAMONYI', 'Kamonyi'), ('RULINDO', 'Rulindo'), ('BUGESERA', 'Bugesera'), ('NYAMASHEKE', 'Nyamasheke'), ('NYARUGURU', 'Nyaruguru'), ('GICUMBI', 'Gicumbi'), ('KIREHE', 'Kirehe'), ('RWAMAGANA', 'Rwamagana'), ('KAYONZA', 'Kayonza'), ('GATSIBO', 'Gatsibo'), ('NGOMA', 'Ngoma'), ('BURERA', 'Burera'), ('NYAMAGABE', 'Nyamagabe'), ('RUHAANGO', 'Ruhaango'), ('RUTSIRO', 'Rutsiro')], max_length=100)),
+                ('month', models.DateField()),
+                ('mission_count', models.IntegerField(default=0)),
+                ('mission_days', models.IntegerField(default=0)),
+                ('approved_count', models.IntegerField(default=0)),
+                ('rejected_count', models.IntegerField(default=0)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mission_statistics', to='core.unit')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='missionstatistic',
+            constraint=models.UniqueConstraint(fields=('unit', 'destination', 'month'), name='unique_mission_statistic'),
+        ),
+    ]
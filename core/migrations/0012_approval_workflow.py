@@ -0,0 +1,75 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_workflow(apps, schema_editor):
+    """Number the existing approvals of each mission, derive its status, and count missions, not approvals."""
+    MissionOrder = apps.get_model('core', 'MissionOrder')
+    Approval = apps.get_model('core', 'Approval')
+    MissionStatistic = apps.get_model('core', 'MissionStatistic')
+
+    for mission in MissionOrder.objects.all().iterator():
+        approvals = list(Approval.objects.filter(mission_order=mission).order_by('created', 'id'))
+        for stage, approval in enumerate(approvals, start=1):
+            approval.stage = stage
+        Approval.objects.bulk_update(approvals, ['stage'])
+        if not approvals:
+            continue
+        last = approvals[-1]
+        mission.stage = last.stage
+        if any(approval.status == 'REJECTED' for approval in approvals):
+            mission.status = 'REJECTED'
+        elif last.status == 'PENDING':
+            mission.current_approver_id = last.approver_id
+        else:
+            mission.status = last.status
+        mission.save(update_fields=['stage', 'status', 'current_approver'])
+
+    for statistic in MissionStatistic.objects.all().iterator():
+        counts = MissionOrder.objects.filter(
+            unit_id=statistic.unit_id, destination=statistic.destination,
+            departure_date__year=statistic.month.year, departure_date__month=statistic.month.month,
+        ).aggregate(
+            approved=Count('id', filter=Q(status='APPROVED')),
+            rejected=Count('id', filter=Q(status='REJECTED')),
+        )
+        statistic.approved_count, statistic.rejected_count = counts['approved'], counts['rejected']
+        statistic.save(update_fields=['approved_count', 'rejected_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approval',
+            name='stage',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='missionorder',
+            name='current_approver',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='awaiting_missions', to='core.staff'),
+        ),
+        migrations.AddField(
+            model_name='missionorder',
+            name='stage',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='missionorder',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected')], db_index=True, default='PENDING', max_length=20),
+        ),
+        migrations.RunPython(backfill_workflow, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='approval',
+            constraint=models.UniqueConstraint(fields=('mission_order', 'stage'), name='unique_approval_stage'),
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:45
+
+from django.db import migrations
+
+from utils.migrations import RunVendorSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_revokedtoken'),
+        ('core', '0013_attachment_uploads'),
+    ]
+
+    operations = [
+        # Database specific, see core.search.
+        RunVendorSQL(
+            'postgresql',
+            sql=[
+                "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+                """
+                ALTER TABLE core_staff ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(phone_number, '')), 'B')
+                ) STORED
+                """,
+                "CREATE INDEX IF NOT EXISTS staff_search_idx ON core_staff USING gin (search_vector)",
+                "CREATE INDEX IF NOT EXISTS staff_name_trgm_idx ON core_staff "
+                "USING gin ((first_name || ' ' || last_name) gin_trgm_ops)",
+                "CREATE INDEX IF NOT EXISTS customuser_email_trgm_idx ON accounts_customuser "
+                "USING gin (email gin_trgm_ops)",
+                """
+                ALTER TABLE core_missionorder ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(purpose_of_mission, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(destination, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(expected_results, '')), 'B')
+                ) STORED
+                """,
+                "CREATE INDEX IF NOT EXISTS missionorder_search_idx ON core_missionorder USING gin (search_vector)",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS missionorder_search_idx",
+                "ALTER TABLE core_missionorder DROP COLUMN IF EXISTS search_vector",
+                "DROP INDEX IF EXISTS customuser_email_trgm_idx",
+                "DROP INDEX IF EXISTS staff_name_trgm_idx",
+                "DROP INDEX IF EXISTS staff_search_idx",
+                "ALTER TABLE core_staff DROP COLUMN IF EXISTS search_vector",
+            ],
+        ),
+        RunVendorSQL(
+            'sqlite',
+            sql=[
+                "CREATE VIRTUAL TABLE IF NOT EXISTS core_staff_fts "
+                "USING fts5(name, email, phone_number, tokenize='trigram')",
+                "CREATE VIRTUAL TABLE IF NOT EXISTS core_missionorder_fts "
+                "USING fts5(purpose_of_mission, expected_results, destination, tokenize='porter unicode61')",
+                """
+                CREATE TRIGGER IF NOT EXISTS core_staff_fts_insert AFTER INSERT ON core_staff BEGIN
+                    INSERT INTO core_staff_fts (rowid, name, email, phone_number)
+                    SELECT staff.id, staff.first_name || ' ' || staff.last_name, account.email,
+                        coalesce(staff.phone_number, '')
+                    FROM core_staff staff JOIN accounts_customuser account ON account.id = staff.user_id
+                    WHERE staff.id = new.id;
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS core_staff_fts_update AFTER UPDATE ON core_staff BEGIN
+                    DELETE FROM core_staff_fts WHERE rowid = old.id;
+                    INSERT INTO core_staff_fts (rowid, name, email, phone_number)
+                    SELECT staff.id, staff.first_name || ' ' || staff.last_name, account.email,
+                        coalesce(staff.phone_number, '')
+                    FROM core_staff staff JOIN accounts_customuser account ON account.id = staff.user_id
+                    WHERE staff.id = new.id;
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS core_staff_fts_delete AFTER DELETE ON core_staff BEGIN
+                    DELETE FROM core_staff_fts WHERE rowid = old.id;
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS core_staff_fts_email AFTER UPDATE OF email ON accounts_customuser BEGIN
+                    UPDATE core_staff_fts SET email = new.email
+                    WHERE rowid IN (SELECT id FROM core_staff WHERE user_id = new.id);
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS core_missionorder_fts_insert AFTER INSERT ON core_missionorder BEGIN
+                    INSERT INTO core_missionorder_fts (rowid, purpose_of_mission, expected_results, destination)
+                    SELECT mission.id, mission.purpose_of_mission, mission.expected_results, mission.destination
+                    FROM core_missionorder mission
+                    WHERE mission.id = new.id;
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS core_missionorder_fts_update
+                AFTER UPDATE OF purpose_of_mission, expected_results, destination ON core_missionorder BEGIN
+                    DELETE FROM core_missionorder_fts WHERE rowid = old.id;
+                    INSERT INTO core_missionorder_fts (rowid, purpose_of_mission, expected_results, destination)
+                    SELECT mission.id, mission.purpose_of_mission, mission.expected_results, mission.destination
+                    FROM core_missionorder mission
+                    WHERE mission.id = new.id;
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS core_missionorder_fts_delete AFTER DELETE ON core_missionorder BEGIN
+                    DELETE FROM core_missionorder_fts WHERE rowid = old.id;
+                END
+                """,
+                # Index the rows written before the triggers.
+                "DELETE FROM core_staff_fts",
+                """
+                INSERT INTO core_staff_fts (rowid, name, email, phone_number)
+                SELECT staff.id, staff.first_name || ' ' || staff.last_name, account.email,
+                    coalesce(staff.phone_number, '')
+                FROM core_staff staff JOIN accounts_customuser account ON account.id = staff.user_id
+                """,
+                "DELETE FROM core_missionorder_fts",
+                """
+                INSERT INTO core_missionorder_fts (rowid, purpose_of_mission, expected_results, destination)
+                SELECT mission.id, mission.purpose_of_mission, mission.expected_results, mission.destination
+                FROM core_missionorder mission
+                """,
+            ],
+            reverse_sql=[
+                "DROP TABLE IF EXISTS core_staff_fts",
+                "DROP TABLE IF EXISTS core_missionorder_fts",
+                "DROP TRIGGER IF EXISTS core_staff_fts_insert",
+                "DROP TRIGGER IF EXISTS core_staff_fts_update",
+                "DROP TRIGGER IF EXISTS core_staff_fts_delete",
+                "DROP TRIGGER IF EXISTS core_staff_fts_email",
+                "DROP TRIGGER IF EXISTS core_missionorder_fts_insert",
+                "DROP TRIGGER IF EXISTS core_missionorder_fts_update",
+                "DROP TRIGGER IF EXISTS core_missionorder_fts_delete",
+            ],
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+from utils.migrations import RunVendorSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='missionorder',
+            index=models.Index(fields=['staff', 'returning_date'], name='mission_staff_returning_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missionorder',
+            index=models.Index(fields=['unit', 'returning_date'], name='mission_unit_returning_idx'),
+        ),
+        # PostgreSQL only, see core.overlaps.
+        RunVendorSQL(
+            'postgresql',
+            sql=[
+                "CREATE EXTENSION IF NOT EXISTS btree_gist",
+                """
+                DO $$
+                DECLARE
+                    overlaps text;
+                BEGIN
+                    SELECT string_agg(pair, ', ') INTO overlaps FROM (
+                        SELECT a.id || ' and ' || b.id AS pair FROM core_missionorder a
+                        JOIN core_missionorder b ON b.staff_id = a.staff_id AND b.id > a.id
+                            AND b.departure_date <= a.returning_date AND a.departure_date <= b.returning_date
+                        WHERE a.status <> 'REJECTED' AND b.status <> 'REJECTED'
+                        LIMIT 20
+                    ) pairs;
+                    IF overlaps IS NOT NULL THEN
+                        RAISE EXCEPTION 'Reject or reschedule the overlapping missions before migrating: %', overlaps;
+                    END IF;
+                END
+                $$
+                """,
+                """
+                ALTER TABLE core_missionorder ADD CONSTRAINT missionorder_no_overlap
+                EXCLUDE USING gist (staff_id WITH =, daterange(departure_date, returning_date, '[]') WITH &&)
+                WHERE (status <> 'REJECTED')
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS missionorder_unit_period_idx ON core_missionorder
+                USING gist (unit_id, daterange(departure_date, returning_date, '[]'))
+                WHERE status <> 'REJECTED'
+                """,
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS missionorder_unit_period_idx",
+                "ALTER TABLE core_missionorder DROP CONSTRAINT IF EXISTS missionorder_no_overlap",
+            ],
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from utils.migrations import RunVendorSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_mission_periods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Driver',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100)),
+                ('phone_number', models.CharField(max_length=15, unique=True)),
+                ('active', models.BooleanField(default=True)),
+                ('campus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drivers', to='core.campus')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('plate_number', models.CharField(max_length=20, unique=True)),
+                ('description', models.CharField(blank=True, max_length=100)),
+                ('seats', models.PositiveSmallIntegerField()),
+                ('active', models.BooleanField(default=True)),
+                ('campus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vehicles', to='core.campus')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='core.driver')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='core.vehicle')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transportation',
+            name='booking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transportations', to='core.vehiclebooking'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclebooking',
+            index=models.Index(fields=['vehicle', 'end_date'], name='booking_vehicle_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclebooking',
+            index=models.Index(fields=['driver', 'end_date'], name='booking_driver_end_idx'),
+        ),
+        # PostgreSQL only, see core.fleet.
+        RunVendorSQL(
+            'postgresql',
+            sql=[
+                "CREATE EXTENSION IF NOT EXISTS btree_gist",
+                """
+                ALTER TABLE core_vehiclebooking ADD CONSTRAINT vehiclebooking_vehicle_no_overlap
+                EXCLUDE USING gist (vehicle_id WITH =, daterange(start_date, end_date, '[]') WITH &&)
+                """,
+                """
+                ALTER TABLE core_vehiclebooking ADD CONSTRAINT vehiclebooking_driver_no_overlap
+                EXCLUDE USING gist (driver_id WITH =, daterange(start_date, end_date, '[]') WITH &&)
+                """,
+            ],
+            reverse_sql=[
+                "ALTER TABLE core_vehiclebooking DROP CONSTRAINT IF EXISTS vehiclebooking_driver_no_overlap",
+                "ALTER TABLE core_vehiclebooking DROP CONSTRAINT IF EXISTS vehiclebooking_vehicle_no_overlap",
+            ],
+        ),
+    ]
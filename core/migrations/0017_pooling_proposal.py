@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_fleet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoolingProposal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('destination', models.CharField(choices=[('KIGALI', 'Kigali'), ('HUYE', 'Huye'), ('MUSANZE', 'Musanze'), ('RUBAVU', 'Rubavu'), ('NYAGATARE', 'Nyagatare'), ('RUSIZI', 'Rusizi'), ('KARONGI', 'Karongi'), ('NYANZA', 'Nyanza'), ('GAKENKE', 'Gakenke'), ('NGORORERO', 'Ngororero'), ('KAMONYI', 'Kamonyi'), ('RULINDO', 'Rulindo'), ('BUGESERA', 'Bugesera'), ('NYAMASHEKE', 'Nyamasheke'), ('NYARUGURU', 'Nyaruguru'), ('GICUMBI', 'Gicumbi'), ('KIREHE', 'Kirehe'), ('RWAMAGANA', 'Rwamagana'), ('KAYONZA', 'Kayonza'), ('GATSIBO', 'Gatsibo'), ('NGOMA', 'Ngoma'), ('BURERA', 'Burera'), ('NYAMAGABE', 'Nyamagabe'), ('RUHAANGO', 'Ruhaango'), ('RUTSIRO', 'Rutsiro')], max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pooling_proposals', to='core.vehiclebooking')),
+                ('campus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pooling_proposals', to='core.campus')),
+                ('missions', models.ManyToManyField(related_name='pooling_proposals', to='core.missionorder')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_pooling_proposal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MissionRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('role', models.CharField(choices=[('STAFF', 'Staff'), ('TUTORIAL_ASSISTANT', 'Tutorial Assistant'), ('ASSISTANT_LECTURER', 'Assistant Lecturer'), ('LECTURER', 'Lecturer'), ('SENIOR_LECTURER', 'Senior Lecturer'), ('ASSOCIATE_PROFESSOR', 'Associate Professor'), ('PROFESSOR', 'Professor')], max_length=100)),
+                ('destination', models.CharField(blank=True, choices=[('KIGALI', 'Kigali'), ('HUYE', 'Huye'), ('MUSANZE', 'Musanze'), ('RUBAVU', 'Rubavu'), ('NYAGATARE', 'Nyagatare'), ('RUSIZI', 'Rusizi'), ('KARONGI', 'Karongi'), ('NYANZA', 'Nyanza'), ('GAKENKE', 'Gakenke'), ('NGORORERO', 'Ngororero'), ('KAMONYI', 'Kamonyi'), ('RULINDO', 'Rulindo'), ('BUGESERA', 'Bugesera'), ('NYAMASHEKE', 'Nyamasheke'), ('NYARUGURU', 'Nyaruguru'), ('GICUMBI', 'Gicumbi'), ('KIREHE', 'Kirehe'), ('RWAMAGANA', 'Rwamagana'), ('KAYONZA', 'Kayonza'), ('GATSIBO', 'Gatsibo'), ('NGOMA', 'Ngoma'), ('BURERA', 'Burera'), ('NYAMAGABE', 'Nyamagabe'), ('RUHAANGO', 'Ruhaango'), ('RUTSIRO', 'Rutsiro')], max_length=100)),
+                ('min_distance_km', models.PositiveIntegerField(default=0)),
+                ('effective_date', models.DateField()),
+                ('daily_allowance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('night_allowance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('km_allowance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='missionorder',
+            name='cost',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='missionrate',
+            constraint=models.UniqueConstraint(fields=('role', 'destination', 'min_distance_km', 'effective_date'), name='unique_mission_rate'),
+        ),
+    ]
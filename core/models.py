@@ -1,10 +1,19 @@
+import uuid
+
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 
+from accounts.authentication import expire_user_claims
 from accounts.models import CustomUser
+from core.routing import get_next_approver_id, invalidate_approval_routing
+from core.workflow import decide
+from core.statistics import record_mission_change, record_mission_deletion, mission_statistic_key
+from core.notifications import approval_request_notifications
+from core.uploads import remove_upload_part
+from core.costs import get_rate_index, invalidate_rate_index, price_mission
 
 
 class TimestampedModel(models.Model):
@@ -96,13 +105,13 @@ class Staff(TimestampedModel):
     def __str__(self):
         return self.user.email
 
+    def get_next_approver_id(self):
+        return get_next_approver_id(self)
+
     def get_next_approver(self):
-        if self.groups.filter(name='Staff').exists():
-            return self.unit.manager
-        elif self.groups.filter(name='Unit Manager').exists():
-            return Staff.objects.filter(groups__name='Campus Manager', unit__college=self.unit.college).first()
-        elif self.groups.filter(name='Campus Manager').exists():
-            return Staff.objects.filter(groups__name__in=['VC', 'DVC']).first()
+        next_approver_id = self.get_next_approver_id()
+        if next_approver_id:
+            return Staff.objects.get(pk=next_approver_id)
 
 
 class TransportationChoices(models.TextChoices):
@@ -111,10 +120,50 @@ class TransportationChoices(models.TextChoices):
     PUBLIC = 'PUBLIC', 'Public'
 
 
+class Vehicle(TimestampedModel):
+    plate_number = models.CharField(max_length=20, unique=True)
+    description = models.CharField(max_length=100, blank=True)
+    seats = models.PositiveSmallIntegerField()
+    campus = models.ForeignKey(Campus, on_delete=models.CASCADE, related_name='vehicles')
+    active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.plate_number
+
+
+class Driver(TimestampedModel):
+    name = models.CharField(max_length=100)
+    phone_number = models.CharField(max_length=15, unique=True)
+    campus = models.ForeignKey(Campus, on_delete=models.CASCADE, related_name='drivers')
+    active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+
+class VehicleBooking(TimestampedModel):
+    """A vehicle and its driver reserved from ``start_date`` to ``end_date`` included, see core.fleet."""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.PROTECT, related_name='bookings')
+    driver = models.ForeignKey(Driver, on_delete=models.PROTECT, related_name='bookings')
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    class Meta:
+        indexes = [
+            # Bookings of a vehicle or driver still running on a date, see core.fleet.
+            models.Index(fields=['vehicle', 'end_date'], name='booking_vehicle_end_idx'),
+            models.Index(fields=['driver', 'end_date'], name='booking_driver_end_idx'),
+        ]
+
+
 class Transportation(TimestampedModel):
     transportation_means = models.CharField(max_length=100, choices=TransportationChoices.choices)
     vehicle_identification = models.CharField(max_length=100, blank=True, null=True)
     driver_name = models.CharField(max_length=100, blank=True, null=True)
+    # Set for PROVIDED transportation once the transport office books a university vehicle, see core.fleet.
+    booking = models.ForeignKey(VehicleBooking, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='transportations'
+                                )
 
 
 class ApprovalDetails(TimestampedModel):
@@ -131,6 +180,27 @@ class ApprovalDetails(TimestampedModel):
 class MissionAttachment(TimestampedModel):
     mission_order = models.ForeignKey('MissionOrder', on_delete=models.CASCADE, related_name='attachments')
     attachment = models.FileField(upload_to='mission_attachments')
+    # Set for uploads through core.uploads, which stores identical files once under their sha256.
+    original_name = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+
+
+class UploadSession(TimestampedModel):
+    """A resumable upload of a mission attachment, received in chunks by core.uploads."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    mission_order = models.ForeignKey('MissionOrder', on_delete=models.CASCADE, related_name='upload_sessions')
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_upload_session_part(sender, instance, **kwargs):
+    remove_upload_part(instance)
 
 
 class MissionRoleChoices(models.TextChoices):
@@ -171,6 +241,12 @@ class DestinationChoices(models.TextChoices):
     RUTSIRO = 'RUTSIRO', 'Rutsiro'
 
 
+class ApprovalStatusChoices(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    APPROVED = 'APPROVED', 'Approved'
+    REJECTED = 'REJECTED', 'Rejected'
+
+
 class MissionOrder(TimestampedModel):
     staff = models.ForeignKey(Staff, on_delete=models.CASCADE, related_name='mission_orders')
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE)
@@ -187,10 +263,55 @@ class MissionOrder(TimestampedModel):
     supervisor_name = models.CharField(max_length=100)
     supervisor_signature = models.CharField(max_length=100)
     approval_details = models.OneToOneField(ApprovalDetails, on_delete=models.CASCADE)
+    # Where the mission stands in the approval workflow, maintained by core.workflow.
+    status = models.CharField(max_length=20, choices=ApprovalStatusChoices.choices,
+                              default=ApprovalStatusChoices.PENDING, db_index=True
+                              )
+    stage = models.PositiveSmallIntegerField(default=1)
+    current_approver = models.ForeignKey(Staff, on_delete=models.SET_NULL, null=True, blank=True,
+                                         related_name='awaiting_missions'
+                                         )
+    # Allowances from the rate tables, see core.costs; null when no rate applies.
+    cost = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
 
-    def save(self, *args, **kwargs):
+    WORKFLOW_FIELDS = ('status', 'stage', 'current_approver')
+
+    class Meta:
+        indexes = [
+            # Missions of a staff member or unit still running on a date, see core.overlaps.
+            models.Index(fields=['staff', 'returning_date'], name='mission_staff_returning_idx'),
+            models.Index(fields=['unit', 'returning_date'], name='mission_unit_returning_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_statistics()
+        return instance
+
+    def snapshot_statistics(self):
+        # Remember which summary row the mission counts towards, see core.statistics.
+        if {'unit_id', 'destination', 'departure_date', 'duration_days', 'status'} <= self.__dict__.keys():
+            self._loaded_statistics = (mission_statistic_key(self), self.duration_days, self.status)
+
+    def compute_durations(self):
         self.duration_days = (self.returning_date - self.departure_date).days
         self.duration_nights = self.duration_days - 1
+
+    def compute_cost(self, rate_index=None):
+        self.cost = price_mission(rate_index if rate_index is not None else get_rate_index(), self)
+
+    def save(self, *args, **kwargs):
+        self.compute_durations()
+        self.compute_cost()
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # The workflow fields only change through core.workflow: read them back rather than overwrite them with
+            # a stale copy, so the statistics also see the current status.
+            self.refresh_from_db(fields=self.WORKFLOW_FIELDS)
+            if hasattr(self, '_loaded_statistics'):
+                self._loaded_statistics = self._loaded_statistics[:2] + (self.status,)
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.WORKFLOW_FIELDS]
         super(MissionOrder, self).save(*args, **kwargs)
 
     # def get_next_approver(self):
@@ -205,15 +326,75 @@ class MissionOrder(TimestampedModel):
 
 @receiver(post_save, sender=MissionOrder)
 def request_approval(sender, instance, created, **kwargs):
-    next_approver = instance.get_next_approver()
-    if next_approver:
-        Approval.objects.create(mission_order=instance, approver=next_approver)
+    if not created:
+        return
+    next_approver_id = instance.staff.get_next_approver_id()
+    if next_approver_id:
+        # The approver is notified through the outbox, in the same transaction as the approval.
+        with transaction.atomic():
+            approval = Approval.objects.create(mission_order=instance, approver_id=next_approver_id)
+            MissionOrder.objects.filter(pk=instance.pk).update(current_approver_id=next_approver_id)
+            instance.current_approver_id = next_approver_id
+            Notification.objects.bulk_create(approval_request_notifications([approval]))
 
 
-class ApprovalStatusChoices(models.TextChoices):
-    PENDING = 'PENDING', 'Pending'
-    APPROVED = 'APPROVED', 'Approved'
-    REJECTED = 'REJECTED', 'Rejected'
+@receiver(post_save, sender=MissionOrder)
+def update_mission_statistics(sender, instance, created, **kwargs):
+    if created or hasattr(instance, '_loaded_statistics'):
+        record_mission_change(instance, created)
+    instance.snapshot_statistics()
+
+
+@receiver(post_delete, sender=MissionOrder)
+def remove_mission_statistics(sender, instance, **kwargs):
+    record_mission_deletion(instance)
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def refresh_approval_routing(sender, **kwargs):
+    invalidate_approval_routing()
+
+
+@receiver(post_save, sender=Staff)
+def expire_claims_on_staff_creation(sender, instance, created, **kwargs):
+    # The staff id is embedded in the tokens of the user.
+    if created:
+        expire_user_claims(instance.user_id)
+
+
+@receiver(post_delete, sender=Staff)
+def expire_claims_on_staff_deletion(sender, instance, **kwargs):
+    expire_user_claims(instance.user_id)
+
+
+class MissionRate(TimestampedModel):
+    """
+    Allowances of a role travelling to a destination, blank for any, over ``min_distance_km`` and up to the next
+    band, from ``effective_date`` on. New rates are added as new versions rather than edited, see core.costs.
+    """
+    role = models.CharField(max_length=100, choices=MissionRoleChoices.choices)
+    destination = models.CharField(max_length=100, choices=DestinationChoices.choices, blank=True)
+    min_distance_km = models.PositiveIntegerField(default=0)
+    effective_date = models.DateField()
+    daily_allowance = models.DecimalField(max_digits=10, decimal_places=2)
+    night_allowance = models.DecimalField(max_digits=10, decimal_places=2)
+    km_allowance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['role', 'destination', 'min_distance_km', 'effective_date'],
+                                    name='unique_mission_rate'),
+        ]
+
+
+@receiver(post_save, sender=MissionRate)
+@receiver(post_delete, sender=MissionRate)
+def refresh_rate_index(sender, **kwargs):
+    invalidate_rate_index()
 
 
 class Approval(TimestampedModel):
@@ -226,14 +407,83 @@ class Approval(TimestampedModel):
     comments = models.TextField(blank=True, null=True)
     rejected = models.BooleanField(default=False)
     rejection_reason = models.TextField(blank=True, null=True)
+    stage = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['approver', 'status', 'created'], name='approval_inbox_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['mission_order', 'stage'], name='unique_approval_stage'),
+        ]
 
-    def approve(self):
-        self.status = ApprovalStatusChoices.APPROVED
-        self.approval_date = timezone.now()
-        self.save()
+    def approve(self, comments=None):
+        decide(self, ApprovalStatusChoices.APPROVED, comments=comments)
 
     def reject(self, reason=''):
-        self.status = ApprovalStatusChoices.REJECTED
-        self.rejected = True
-        self.rejection_reason = reason
-        self.save()
+        decide(self, ApprovalStatusChoices.REJECTED, rejection_reason=reason)
+
+
+class MissionStatistic(models.Model):
+    """Mission counts per unit, destination and month, kept up to date by core.statistics."""
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='mission_statistics')
+    destination = models.CharField(max_length=100, choices=DestinationChoices.choices)
+    month = models.DateField()
+    mission_count = models.IntegerField(default=0)
+    mission_days = models.IntegerField(default=0)
+    approved_count = models.IntegerField(default=0)
+    rejected_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['unit', 'destination', 'month'], name='unique_mission_statistic'),
+        ]
+
+
+class NotificationChannelChoices(models.TextChoices):
+    EMAIL = 'EMAIL', 'Email'
+    SMS = 'SMS', 'SMS'
+
+
+class NotificationStatusChoices(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    SENT = 'SENT', 'Sent'
+    FAILED = 'FAILED', 'Failed'
+
+
+class Notification(TimestampedModel):
+    """Outbox of messages to send, written with the change they announce and sent by send_notifications."""
+    channel = models.CharField(max_length=10, choices=NotificationChannelChoices.choices)
+    recipient = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=NotificationStatusChoices.choices,
+                              default=NotificationStatusChoices.PENDING
+                              )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_outbox_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_channel_display()} to {self.recipient}'
+
+
+class PoolingProposal(TimestampedModel):
+    """
+    Missions from the same campus to the same destination on common dates that could share a vehicle, proposed by
+    propose_pools, see core.pooling. Accepting the proposal books them a single vehicle.
+    """
+    campus = models.ForeignKey(Campus, on_delete=models.CASCADE, related_name='pooling_proposals')
+    destination = models.CharField(max_length=100, choices=DestinationChoices.choices)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    missions = models.ManyToManyField(MissionOrder, related_name='pooling_proposals')
+    booking = models.ForeignKey(VehicleBooking, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='pooling_proposals'
+                                )
@@ -0,0 +1,128 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_LEASE = timedelta(minutes=5)
+
+
+class BaseSMSBackend:
+    def send(self, phone_number, body):
+        raise NotImplementedError
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    """Log the messages instead of sending them, for development."""
+
+    def send(self, phone_number, body):
+        logger.info('SMS to %s: %s', phone_number, body)
+
+
+class LocMemSMSBackend(BaseSMSBackend):
+    """Keep the messages in ``LocMemSMSBackend.outbox``, for tests."""
+    outbox = []
+
+    def send(self, phone_number, body):
+        self.outbox.append((phone_number, body))
+
+
+def get_sms_backend():
+    return import_string(getattr(settings, 'SMS_BACKEND', 'core.notifications.ConsoleSMSBackend'))()
+
+
+def approval_request_notifications(approvals):
+    """
+    Build, without saving, the notifications telling approvers that a mission awaits them: an email and,
+    when the approver has a phone number, an SMS.
+    """
+    from core.models import Notification, NotificationChannelChoices, Staff
+
+    approvers = {
+        staff_id: (email, phone_number)
+        for staff_id, email, phone_number in Staff.objects.filter(
+            pk__in={approval.approver_id for approval in approvals}
+        ).values_list('id', 'user__email', 'phone_number')
+    }
+    notifications = []
+    for approval in approvals:
+        mission = approval.mission_order
+        email, phone_number = approvers[approval.approver_id]
+        body = (f'{mission.staff.first_name} {mission.staff.last_name} requests your approval for a mission to '
+                f'{mission.get_destination_display()} from {mission.departure_date} to {mission.returning_date}.')
+        notifications.append(Notification(channel=NotificationChannelChoices.EMAIL, recipient=email,
+                                          subject='Mission order awaiting your approval', body=body))
+        if phone_number:
+            notifications.append(Notification(channel=NotificationChannelChoices.SMS, recipient=phone_number,
+                                              body=body))
+    return notifications
+
+
+def mission_decision_notifications(mission):
+    """Build, without saving, the notifications telling the staff member that their mission was approved or rejected."""
+    from core.models import Notification, NotificationChannelChoices
+
+    body = (f'Your mission to {mission.get_destination_display()} from {mission.departure_date} to '
+            f'{mission.returning_date} was {mission.get_status_display().lower()}.')
+    notifications = [Notification(channel=NotificationChannelChoices.EMAIL, recipient=mission.staff.user.email,
+                                  subject=f'Mission order {mission.get_status_display().lower()}', body=body)]
+    if mission.staff.phone_number:
+        notifications.append(Notification(channel=NotificationChannelChoices.SMS,
+                                          recipient=mission.staff.phone_number, body=body))
+    return notifications
+
+
+def claim_notifications(batch_size):
+    """
+    Take up to ``batch_size`` due notifications, leasing them so other workers skip them until the lease runs out.
+    """
+    from core.models import Notification, NotificationStatusChoices
+
+    now = timezone.now()
+    with transaction.atomic():
+        due = Notification.objects.filter(status=NotificationStatusChoices.PENDING, next_attempt_at__lte=now)
+        notifications = list(due.order_by('next_attempt_at').select_for_update(skip_locked=True)[:batch_size])
+        Notification.objects.filter(pk__in=[notification.pk for notification in notifications]).update(
+            next_attempt_at=now + NOTIFICATION_LEASE)
+    return notifications
+
+
+def deliver(notification, sms_backend):
+    from core.models import NotificationChannelChoices
+
+    if notification.channel == NotificationChannelChoices.EMAIL:
+        send_mail(notification.subject, notification.body, None, [notification.recipient])
+    else:
+        sms_backend.send(notification.recipient, notification.body)
+
+
+def send_notifications(batch_size=100, backoff=timedelta(minutes=1), max_backoff=timedelta(hours=1)):
+    """Send one batch of due notifications, rescheduling the failed ones with exponential backoff."""
+    from core.models import Notification, NotificationStatusChoices
+
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    notifications = claim_notifications(batch_size)
+    sms_backend = get_sms_backend()
+    for notification in notifications:
+        notification.attempts += 1
+        try:
+            deliver(notification, sms_backend)
+        except Exception as exc:
+            logger.warning('Could not send notification %s: %s', notification.pk, exc)
+            notification.last_error = str(exc)
+            if notification.attempts >= max_attempts:
+                notification.status = NotificationStatusChoices.FAILED
+            else:
+                notification.next_attempt_at = timezone.now() + min(backoff * 2 ** (notification.attempts - 1),
+                                                                       max_backoff)
+        else:
+            notification.status = NotificationStatusChoices.SENT
+            notification.sent_at = timezone.now()
+    Notification.objects.bulk_update(
+        notifications, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return notifications
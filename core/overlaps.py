@@ -0,0 +1,76 @@
+"""
+Date range queries over missions: conflicting missions of a staff member and who is away in a unit.
+
+On PostgreSQL, an exclusion constraint over ``daterange(departure_date, returning_date)`` rejects overlapping
+missions of the same staff member even under concurrent requests, and a GiST index on the unit and the same
+expression answers the overlap queries. Elsewhere, the (staff, returning_date) and (unit, returning_date) indexes
+narrow the scan down to the missions still running at the start of the range. Migration 0015_mission_periods
+creates them.
+
+Rejected missions free their dates.
+"""
+import bisect
+from collections import defaultdict
+from operator import itemgetter
+
+from django.db import connection
+from django.db.models import BooleanField, DateField, Func, Value
+
+
+class DateRangeOverlaps(Func):
+    """
+    ``daterange(start_date, end_date, '[]') && daterange(start, end, '[]')``, the expression indexed by the
+    exclusion constraints. Compiled from column references, so it also works in subqueries.
+    """
+    output_field = BooleanField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        return "daterange({}, {}, '[]') && daterange({}, {}, '[]')".format(*sqls), params
+
+
+def overlapping_missions(queryset, start, end):
+    """Filter ``queryset`` to the missions, not rejected, running on any day from ``start`` to ``end`` included."""
+    from core.models import ApprovalStatusChoices
+
+    queryset = queryset.exclude(status=ApprovalStatusChoices.REJECTED)
+    if connection.vendor == 'postgresql':
+        return queryset.filter(DateRangeOverlaps('departure_date', 'returning_date',
+                                                 Value(start, output_field=DateField()),
+                                                 Value(end, output_field=DateField())))
+    return queryset.filter(returning_date__gte=start, departure_date__lte=end)
+
+
+def find_conflicts(periods):
+    """
+    Map each staff id of ``periods``, ``(staff_id, start, end)`` tuples, to one of their missions overlapping that
+    period, if any, as ``(id, departure_date, returning_date)``.
+
+    One query for all of them, then a binary search in each staff member's missions sorted by departure.
+    """
+    from core.models import MissionOrder
+
+    if not periods:
+        return {}
+    missions = defaultdict(list)
+    candidates = overlapping_missions(
+        MissionOrder.objects.filter(staff_id__in={staff_id for staff_id, _, _ in periods}),
+        min(start for _, start, _ in periods), max(end for _, _, end in periods),
+    ).order_by('departure_date').values_list('staff_id', 'departure_date', 'returning_date', 'id')
+    for staff_id, departure_date, returning_date, mission_id in candidates:
+        missions[staff_id].append((departure_date, returning_date, mission_id))
+
+    conflicts = {}
+    for staff_id, start, end in periods:
+        staff_missions = missions.get(staff_id, [])
+        # Only the missions leaving by the end of the period can overlap it.
+        leaving = bisect.bisect_right(staff_missions, end, key=itemgetter(0))
+        for departure_date, returning_date, mission_id in staff_missions[:leaving]:
+            if returning_date >= start:
+                conflicts[staff_id] = (mission_id, departure_date, returning_date)
+                break
+    return conflicts
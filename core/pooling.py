@@ -0,0 +1,77 @@
+"""
+Proposals of shared vehicles for the upcoming missions going the same way.
+
+Missions are pooled when they leave from the same campus, that of their staff member, for the same destination,
+and are all away on at least one common day. Rather than comparing every pair of missions, the candidates are
+sorted by campus, destination and departure, then swept once: a mission joins the current pool while it leaves
+before anyone in the pool is back and the pool still fits in the largest active vehicle of the campus, otherwise
+it starts a new pool.
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+
+def pool_missions(missions, capacities):
+    """
+    Group ``missions``, ``(id, campus_id, destination, departure_date, returning_date)`` tuples, into pools of at
+    least two missions and at most the seats ``capacities`` maps their campus id to, returned as
+    ``(campus_id, destination, start_date, end_date, mission_ids)``.
+    """
+    pools = []
+    missions = sorted(missions, key=itemgetter(1, 2, 3, 4))
+    for (campus_id, destination), route in groupby(missions, key=itemgetter(1, 2)):
+        capacity = capacities.get(campus_id, 0)
+        if capacity < 2:
+            continue
+        pool, start_date, end_date, first_return = [], None, None, None
+        for mission_id, _, _, departure_date, returning_date in route:
+            if pool and (departure_date > first_return or len(pool) == capacity):
+                # Someone in the pool is back before this mission leaves, or the pool is full.
+                pools.append((campus_id, destination, start_date, end_date, pool))
+                pool = []
+            if not pool:
+                start_date, end_date, first_return = departure_date, returning_date, returning_date
+            pool.append(mission_id)
+            end_date = max(end_date, returning_date)
+            first_return = min(first_return, returning_date)
+        pools.append((campus_id, destination, start_date, end_date, pool))
+    return [pool for pool in pools if len(pool[4]) > 1]
+
+
+def pooling_candidates():
+    """The upcoming missions, not rejected, on provided transportation and not already pooled."""
+    from core.models import ApprovalStatusChoices, MissionOrder, TransportationChoices
+
+    return MissionOrder.objects.filter(
+        departure_date__gte=timezone.localdate(),
+        transportation__transportation_means=TransportationChoices.PROVIDED,
+    ).exclude(
+        status=ApprovalStatusChoices.REJECTED,
+    ).exclude(
+        pooling_proposals__booking__isnull=False,
+    )
+
+
+@transaction.atomic
+def propose_pools():
+    """Replace the proposals not accepted yet with those of the current missions, and return them."""
+    from core.models import PoolingProposal, Vehicle
+
+    PoolingProposal.objects.filter(booking__isnull=True).delete()
+    capacities = dict(Vehicle.objects.filter(active=True).values('campus_id').annotate(
+        seats=Max('seats')).values_list('campus_id', 'seats'))
+    pools = pool_missions(pooling_candidates().values_list(
+        'id', 'staff__campus_id', 'destination', 'departure_date', 'returning_date'), capacities)
+    proposals = PoolingProposal.objects.bulk_create([
+        PoolingProposal(campus_id=campus_id, destination=destination, start_date=start_date, end_date=end_date)
+        for campus_id, destination, start_date, end_date, _ in pools
+    ])
+    PoolingProposal.missions.through.objects.bulk_create([
+        PoolingProposal.missions.through(poolingproposal_id=proposal.pk, missionorder_id=mission_id)
+        for proposal, pool in zip(proposals, pools) for mission_id in pool[4]
+    ])
+    return proposals
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.groups import load_group_names, load_group_names_many
+
+APPROVAL_ROUTING_CACHE_KEY = 'core:approval_routing'
+APPROVAL_ROUTING_CACHE_TIMEOUT = 60 * 60
+
+
+def build_approval_routing():
+    """
+    Materialize who approves for whom:
+
+    - ``units`` maps a unit to its college and manager, the approver of its staff,
+    - ``colleges`` maps a college to its campus manager, the approver of its unit managers,
+    - ``top`` is the VC/DVC approving for campus managers.
+    """
+    from core.models import Unit, Staff
+
+    units = {unit_id: (college_id, manager_id)
+             for unit_id, college_id, manager_id in Unit.objects.values_list('id', 'college_id', 'manager_id')}
+    colleges = {}
+    campus_managers = Staff.objects.filter(user__groups__name='Campus Manager').order_by('pk')
+    for staff_id, college_id in campus_managers.values_list('id', 'unit__college_id'):
+        colleges.setdefault(college_id, staff_id)
+    top = Staff.objects.filter(user__groups__name__in=['VC', 'DVC']).order_by('pk').values_list('id', flat=True)
+    return {'units': units, 'colleges': colleges, 'top': top.first()}
+
+
+def get_approval_routing():
+    routing = cache.get(APPROVAL_ROUTING_CACHE_KEY)
+    if routing is None:
+        routing = build_approval_routing()
+        cache.set(APPROVAL_ROUTING_CACHE_KEY, routing, APPROVAL_ROUTING_CACHE_TIMEOUT)
+    return routing
+
+
+def invalidate_approval_routing():
+    # Once the change commits, or a concurrent request could rebuild the routing from the rows committed before it.
+    transaction.on_commit(lambda: cache.delete(APPROVAL_ROUTING_CACHE_KEY))
+
+
+def route(routing, staff, group_names):
+    college_id, manager_id = routing['units'].get(staff.unit_id, (None, None))
+    if 'Staff' in group_names:
+        return manager_id
+    elif 'Unit Manager' in group_names:
+        return routing['colleges'].get(college_id)
+    elif 'Campus Manager' in group_names:
+        return routing['top']
+
+
+def get_next_approver_id(staff):
+    """Return the id of the staff who approves missions of ``staff``, or None."""
+    return route(get_approval_routing(), staff, load_group_names(staff.user_id))
+
+
+def get_next_approver_ids(staff_members):
+    """Return a mapping of staff id to approver id for many staff at once."""
+    routing = get_approval_routing()
+    group_names = load_group_names_many(staff.user_id for staff in staff_members)
+    return {staff.pk: route(routing, staff, group_names[staff.user_id]) for staff in staff_members}
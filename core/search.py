@@ -0,0 +1,191 @@
+"""
+Full-text search over staff and mission orders.
+
+The search columns live outside the models and are maintained by the database itself, so every write path
+(save, bulk_create, update, imports) keeps them current:
+
+- on PostgreSQL, generated ``tsvector`` columns with GIN indexes, plus trigram indexes for fuzzy names and emails,
+- on SQLite, FTS5 tables kept in sync by triggers, for development and tests.
+
+Migration 0014_search creates them. PostgreSQL refuses to change the type of a column a generated column reads: a
+migration altering one of them has to drop the search columns first and add them again afterwards, copying their
+SQL from that migration.
+"""
+from django.db import connection
+from django.db.models import BooleanField, F, Field, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+
+SQLITE_STAFF_FTS_ROW = """
+    SELECT staff.id, staff.first_name || ' ' || staff.last_name, account.email, coalesce(staff.phone_number, '')
+    FROM core_staff staff JOIN accounts_customuser account ON account.id = staff.user_id
+"""
+SQLITE_MISSION_FTS_ROW = """
+    SELECT mission.id, mission.purpose_of_mission, mission.expected_results, mission.destination
+    FROM core_missionorder mission
+"""
+
+# Triggers are dropped with their table when SQLite migrations rebuild it, hence IF NOT EXISTS and the
+# post_migrate hook in core.apps putting them back. The same as migration 0014_search creates.
+SQLITE_SEARCH_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS core_staff_fts_insert AFTER INSERT ON core_staff BEGIN
+        INSERT INTO core_staff_fts (rowid, name, email, phone_number) {SQLITE_STAFF_FTS_ROW} WHERE staff.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS core_staff_fts_update AFTER UPDATE ON core_staff BEGIN
+        DELETE FROM core_staff_fts WHERE rowid = old.id;
+        INSERT INTO core_staff_fts (rowid, name, email, phone_number) {SQLITE_STAFF_FTS_ROW} WHERE staff.id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_staff_fts_delete AFTER DELETE ON core_staff BEGIN
+        DELETE FROM core_staff_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_staff_fts_email AFTER UPDATE OF email ON accounts_customuser BEGIN
+        UPDATE core_staff_fts SET email = new.email WHERE rowid IN (SELECT id FROM core_staff WHERE user_id = new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS core_missionorder_fts_insert AFTER INSERT ON core_missionorder BEGIN
+        INSERT INTO core_missionorder_fts (rowid, purpose_of_mission, expected_results, destination)
+        {SQLITE_MISSION_FTS_ROW} WHERE mission.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS core_missionorder_fts_update
+    AFTER UPDATE OF purpose_of_mission, expected_results, destination ON core_missionorder BEGIN
+        DELETE FROM core_missionorder_fts WHERE rowid = old.id;
+        INSERT INTO core_missionorder_fts (rowid, purpose_of_mission, expected_results, destination)
+        {SQLITE_MISSION_FTS_ROW} WHERE mission.id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_missionorder_fts_delete AFTER DELETE ON core_missionorder BEGIN
+        DELETE FROM core_missionorder_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_REBUILD_SEARCH_INDEX = [
+    "DELETE FROM core_staff_fts",
+    f"INSERT INTO core_staff_fts (rowid, name, email, phone_number) {SQLITE_STAFF_FTS_ROW}",
+    "DELETE FROM core_missionorder_fts",
+    f"INSERT INTO core_missionorder_fts (rowid, purpose_of_mission, expected_results, destination) "
+    f"{SQLITE_MISSION_FTS_ROW}",
+]
+
+
+def execute_all(cursor, statements):
+    for statement in statements:
+        cursor.execute(statement)
+
+
+def restore_sqlite_search_triggers(db_connection):
+    """Recreate the triggers a table rebuild dropped, and reindex what was written without them."""
+    with db_connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'core_%_fts_%'")
+        if cursor.fetchone()[0] == len(SQLITE_SEARCH_TRIGGERS):
+            return
+        execute_all(cursor, SQLITE_SEARCH_TRIGGERS)
+        execute_all(cursor, SQLITE_REBUILD_SEARCH_INDEX)
+
+
+def fts5_query(terms, min_length=1):
+    """Quote each word of ``terms`` as an FTS5 string so user input cannot inject query syntax."""
+    words = [word for word in terms.split() if len(word) >= min_length]
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def like_pattern(terms):
+    return '%' + terms.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+class SearchSQL(Func):
+    """
+    SQL whose ``{}`` placeholders are filled with the compiled ``expressions``, so the columns it reads are referred
+    to by the alias of their table in any query, subqueries included, like core.overlaps.DateRangeOverlaps.
+    """
+
+    def __init__(self, sql, *expressions, output_field):
+        self.sql = sql
+        super().__init__(*expressions, output_field=output_field)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        return self.sql.format(*sqls), params
+
+
+class SearchVectorColumn(Func):
+    """The ``search_vector`` column of the queried model, outside its fields, see migration 0014_search."""
+
+    def __init__(self):
+        super().__init__(F('pk'), output_field=Field())
+
+    def as_sql(self, compiler, connection, **extra_context):
+        [column] = self.get_source_expressions()
+        return f'{compiler.quote_name_unless_alias(column.alias)}.search_vector', []
+
+
+def search_staff(queryset, terms):
+    """Filter ``queryset`` to the staff matching ``terms`` by name, email or phone number, best matches first."""
+    terms = terms.strip()
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        return queryset.alias(
+            matched=SearchSQL(
+                "{} @@ websearch_to_tsquery('simple', {}) OR ({} || ' ' || {}) %% {} "
+                "OR {} IN (SELECT id FROM accounts_customuser WHERE email ILIKE {})",
+                SearchVectorColumn(), Value(terms), F('first_name'), F('last_name'), Value(terms), F('user_id'),
+                Value(like_pattern(terms)), output_field=BooleanField()),
+        ).annotate(
+            rank=SearchSQL(
+                "ts_rank({}, websearch_to_tsquery('simple', {})) + similarity({} || ' ' || {}, {})",
+                SearchVectorColumn(), Value(terms), F('first_name'), F('last_name'), Value(terms),
+                output_field=FloatField()),
+        ).filter(matched=True).order_by('-rank', 'pk')
+
+    # The trigram tokenizer needs at least three characters per word.
+    query = fts5_query(terms, min_length=3)
+    if not query:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL("SELECT rowid FROM core_staff_fts WHERE core_staff_fts MATCH %s", (query,)),
+    ).annotate(
+        rank=SearchSQL("(SELECT -bm25(core_staff_fts) FROM core_staff_fts "
+                       "WHERE core_staff_fts MATCH {} AND core_staff_fts.rowid = {})",
+                       Value(query), F('pk'), output_field=FloatField()),
+    ).order_by('-rank', 'pk')
+
+
+def search_missions(queryset, terms):
+    """Filter ``queryset`` to the missions whose purpose, expected results or destination match ``terms``."""
+    terms = terms.strip()
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        return queryset.alias(
+            matched=SearchSQL("{} @@ websearch_to_tsquery('english', {})", SearchVectorColumn(), Value(terms),
+                              output_field=BooleanField()),
+        ).annotate(
+            rank=SearchSQL("ts_rank({}, websearch_to_tsquery('english', {}))", SearchVectorColumn(), Value(terms),
+                           output_field=FloatField()),
+        ).filter(matched=True).order_by('-rank', '-pk')
+
+    query = fts5_query(terms)
+    if not query:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL("SELECT rowid FROM core_missionorder_fts WHERE core_missionorder_fts MATCH %s", (query,)),
+    ).annotate(
+        rank=SearchSQL("(SELECT -bm25(core_missionorder_fts) FROM core_missionorder_fts "
+                       "WHERE core_missionorder_fts MATCH {} AND core_missionorder_fts.rowid = {})",
+                       Value(query), F('pk'), output_field=FloatField()),
+    ).order_by('-rank', '-pk')
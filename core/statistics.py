@@ -0,0 +1,119 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction, IntegrityError
+from django.db.models import F, Count, Sum, Q
+from django.db.models.functions import TruncMonth
+
+STATISTIC_COUNTERS = ('mission_count', 'mission_days', 'approved_count', 'rejected_count')
+
+
+def statistic_key(unit_id, destination, departure_date):
+    return unit_id, destination, departure_date.replace(day=1)
+
+
+def mission_statistic_key(mission):
+    return statistic_key(mission.unit_id, mission.destination, mission.departure_date)
+
+
+def apply_statistic_delta(key, **deltas):
+    """Add ``deltas`` to the counters of the (unit, destination, month) summary row, creating it if needed."""
+    from core.models import MissionStatistic
+
+    deltas = {counter: delta for counter, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    unit_id, destination, month = key
+    rows = MissionStatistic.objects.filter(unit_id=unit_id, destination=destination, month=month)
+    if rows.update(**{counter: F(counter) + delta for counter, delta in deltas.items()}):
+        return
+    if any(delta < 0 for delta in deltas.values()):
+        # Nothing to take away from: the row went away with its unit, or the table is being rebuilt.
+        return
+    try:
+        with transaction.atomic():
+            MissionStatistic.objects.create(unit_id=unit_id, destination=destination, month=month, **deltas)
+    except IntegrityError:
+        # Created concurrently, add to it instead.
+        rows.update(**{counter: F(counter) + delta for counter, delta in deltas.items()})
+
+
+def record_missions(missions):
+    """Count newly created missions, one UPDATE per summary row touched."""
+    deltas = defaultdict(Counter)
+    for mission in missions:
+        deltas[mission_statistic_key(mission)].update(mission_counters(mission.duration_days, mission.status))
+    for key, delta in deltas.items():
+        apply_statistic_delta(key, **delta)
+
+
+def status_counter(status):
+    from core.models import ApprovalStatusChoices
+
+    return {
+        ApprovalStatusChoices.APPROVED: 'approved_count',
+        ApprovalStatusChoices.REJECTED: 'rejected_count',
+    }.get(status)
+
+
+def mission_counters(days, status, sign=1):
+    counters = Counter(mission_count=sign, mission_days=sign * days)
+    if status_counter(status):
+        counters[status_counter(status)] += sign
+    return counters
+
+
+def record_mission_change(mission, created):
+    key = mission_statistic_key(mission)
+    if created:
+        apply_statistic_delta(key, **mission_counters(mission.duration_days, mission.status))
+        return
+    loaded_key, loaded_days, loaded_status = mission._loaded_statistics
+    if loaded_key != key:
+        apply_statistic_delta(loaded_key, **mission_counters(loaded_days, loaded_status, sign=-1))
+        apply_statistic_delta(key, **mission_counters(mission.duration_days, mission.status))
+    else:
+        deltas = mission_counters(mission.duration_days, mission.status)
+        deltas.subtract(mission_counters(loaded_days, loaded_status))
+        apply_statistic_delta(key, **deltas)
+
+
+def record_mission_deletion(mission):
+    loaded_key, loaded_days, loaded_status = getattr(
+        mission, '_loaded_statistics', (mission_statistic_key(mission), mission.duration_days, mission.status))
+    apply_statistic_delta(loaded_key, **mission_counters(loaded_days, loaded_status, sign=-1))
+
+
+def record_mission_status_change(mission, old_status, new_status):
+    """Count a workflow decision, which updates the mission without saving it and so without signals."""
+    deltas = Counter()
+    if status_counter(old_status):
+        deltas[status_counter(old_status)] -= 1
+    if status_counter(new_status):
+        deltas[status_counter(new_status)] += 1
+    apply_statistic_delta(mission_statistic_key(mission), **deltas)
+
+
+@transaction.atomic
+def rebuild_mission_statistics():
+    """Recompute the whole summary table from the missions, returning the number of rows."""
+    from core.models import MissionOrder, ApprovalStatusChoices, MissionStatistic
+
+    rows = defaultdict(Counter)
+    missions = MissionOrder.objects.values('unit_id', 'destination', month=TruncMonth('departure_date')).annotate(
+        missions=Count('id'), days=Sum('duration_days'),
+        approved=Count('id', filter=Q(status=ApprovalStatusChoices.APPROVED)),
+        rejected=Count('id', filter=Q(status=ApprovalStatusChoices.REJECTED)),
+    ).order_by()
+    for row in missions:
+        key = (row['unit_id'], row['destination'], row['month'])
+        rows[key]['mission_count'] = row['missions']
+        rows[key]['mission_days'] = row['days']
+        rows[key]['approved_count'] = row['approved']
+        rows[key]['rejected_count'] = row['rejected']
+
+    MissionStatistic.objects.all().delete()
+    MissionStatistic.objects.bulk_create([
+        MissionStatistic(unit_id=unit_id, destination=destination, month=month, **counters)
+        for (unit_id, destination, month), counters in rows.items()
+    ])
+    return len(rows)
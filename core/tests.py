@@ -1,3 +1,352 @@
-from django.test import TestCase
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core import mail
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core.models import College, Unit, Campus, Staff, MissionOrder, Transportation, ApprovalDetails, Approval, \
+    ApprovalStatusChoices, MissionStatistic, Notification, NotificationChannelChoices, NotificationStatusChoices, \
+    MissionRate
+from core.costs import find_rate, get_rate_index, price_missions
+from core.notifications import NOTIFICATION_LEASE, LocMemSMSBackend, claim_notifications, send_notifications
+from core.routing import get_next_approver_id
+from core.search import search_missions, search_staff
+from core.statistics import STATISTIC_COUNTERS, rebuild_mission_statistics, record_missions
+from core.workflow import TransitionConflict, decide
+
+
+class MissionsTestCase(TestCase):
+    """A staff member's mission, approved by their unit manager and then by the campus manager of the college."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_groups_and_permissions', stdout=io.StringIO())
+        college = College.objects.create(name='College of Science and Technology', short_name='CST')
+        cls.unit = Unit.objects.create(name='School of ICT', short_name='ICT', college=college)
+        cls.campus = Campus.objects.create(name='Nyarugenge')
+        cls.manager = cls.create_staff('manager@ur.ac.rw', 'Unit Manager', '250788000001')
+        cls.unit.manager = cls.manager
+        cls.unit.save()
+        cls.campus_manager = cls.create_staff('campus.manager@ur.ac.rw', 'Campus Manager', '250788000002')
+        cls.staff = cls.create_staff('staff@ur.ac.rw', 'Staff', '250788000003')
+
+    @classmethod
+    def create_staff(cls, email, group, phone_number):
+        user = CustomUser.objects.create_user(email, 'Missions@2024')
+        user.groups.add(Group.objects.get(name=group))
+        return Staff.objects.create(user=user, first_name=email.split('@')[0], last_name='Test', gender='MALE',
+                                    unit=cls.unit, campus=cls.campus, phone_number=phone_number)
+
+    def setUp(self):
+        # The approval routing and the group names are cached, and ids are reused from one test to the next.
+        cache.clear()
+        self.mission = MissionOrder.objects.create(**self.mission_data(self.staff, date(2024, 3, 1), date(2024, 3, 4)))
+
+    def mission_data(self, staff, departure_date, returning_date, **kwargs):
+        return {
+            'staff': staff, 'unit': self.unit, 'role': 'LECTURER', 'purpose_of_mission': 'Teaching',
+            'expected_results': 'Courses', 'destination': 'HUYE', 'departure_date': departure_date,
+            'returning_date': returning_date,
+            'transportation': Transportation.objects.create(transportation_means='PROVIDED'),
+            'supervisor_name': 'Supervisor', 'supervisor_signature': 'Signature',
+            'approval_details': ApprovalDetails.objects.create(
+                done_at='Kigali', done_on=date(2024, 2, 20), authorized_by='Director',
+                authorized_signature='Signature', acknowledged_by_hr='HR'),
+            **kwargs,
+        }
+
+    def pending_approval(self):
+        return Approval.objects.get(mission_order=self.mission, status=ApprovalStatusChoices.PENDING)
+
+class WorkflowTests(MissionsTestCase):
+    def test_mission_goes_through_every_stage(self):
+        approval = self.pending_approval()
+        self.assertEqual((approval.approver, approval.stage), (self.manager, 1))
+        decide(approval, ApprovalStatusChoices.APPROVED)
+
+        self.mission.refresh_from_db()
+        self.assertEqual((self.mission.status, self.mission.stage), (ApprovalStatusChoices.PENDING, 2))
+        self.assertEqual(self.mission.current_approver, self.campus_manager)
+        approval = self.pending_approval()
+        self.assertEqual((approval.approver, approval.stage), (self.campus_manager, 2))
+        decide(approval, ApprovalStatusChoices.APPROVED)
+
+        # Nobody approves after the campus manager here.
+        self.mission.refresh_from_db()
+        self.assertEqual(self.mission.status, ApprovalStatusChoices.APPROVED)
+        self.assertIsNone(self.mission.current_approver)
+        self.assertFalse(Approval.objects.filter(status=ApprovalStatusChoices.PENDING).exists())
+
+    def test_rejection_ends_the_workflow(self):
+        decide(self.pending_approval(), ApprovalStatusChoices.REJECTED, rejection_reason='No budget')
+        self.mission.refresh_from_db()
+        self.assertEqual((self.mission.status, self.mission.stage), (ApprovalStatusChoices.REJECTED, 1))
+        self.assertEqual(self.mission.approvals.count(), 1)
+
+    def test_concurrent_decisions_conflict(self):
+        # Both requests loaded the approval while it was pending.
+        approval, stale_approval = self.pending_approval(), self.pending_approval()
+        decide(approval, ApprovalStatusChoices.APPROVED)
+        with self.assertRaises(TransitionConflict):
+            decide(stale_approval, ApprovalStatusChoices.REJECTED)
+
+        # The losing decision was rolled back entirely.
+        stale_approval.refresh_from_db()
+        self.assertEqual(stale_approval.status, ApprovalStatusChoices.APPROVED)
+        self.mission.refresh_from_db()
+        self.assertEqual((self.mission.status, self.mission.stage), (ApprovalStatusChoices.PENDING, 2))
+        self.assertEqual(self.mission.approvals.count(), 2)
+
+    def test_routing_is_invalidated_on_commit(self):
+        self.assertEqual(get_next_approver_id(self.staff), self.manager.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unit.manager = self.campus_manager
+            self.unit.save()
+            # Until the change commits, other requests still route to the committed manager.
+            self.assertEqual(get_next_approver_id(self.staff), self.manager.pk)
+        self.assertEqual(get_next_approver_id(self.staff), self.campus_manager.pk)
+
+
+class MissionStatisticsTests(MissionsTestCase):
+    """The summary table, maintained on each write, matches the one rebuilt from scratch."""
+
+    def assertStatisticsMatchRebuild(self):
+        counters = ('unit_id', 'destination', 'month', *STATISTIC_COUNTERS)
+        # Rows emptied by the writes stay behind, a rebuild does not create them.
+        maintained = set(MissionStatistic.objects.exclude(mission_count=0).values_list(*counters))
+        rebuild_mission_statistics()
+        self.assertEqual(maintained, set(MissionStatistic.objects.values_list(*counters)))
+        self.assertTrue(maintained or not MissionOrder.objects.exists())
+
+    def test_creation(self):
+        MissionOrder.objects.create(**self.mission_data(self.campus_manager, date(2024, 3, 10), date(2024, 3, 12)))
+        self.assertStatisticsMatchRebuild()
+        self.assertEqual(MissionStatistic.objects.get().mission_count, 2)
+
+    def test_move_to_another_month(self):
+        self.mission.departure_date, self.mission.returning_date = date(2024, 4, 1), date(2024, 4, 8)
+        self.mission.save()
+        self.assertStatisticsMatchRebuild()
+        self.assertEqual(MissionStatistic.objects.get().month, date(2024, 4, 1))
+
+    def test_change_of_duration_and_destination(self):
+        self.mission.returning_date = date(2024, 3, 9)
+        self.mission.save()
+        self.assertStatisticsMatchRebuild()
+        self.mission.destination = 'RUSIZI'
+        self.mission.save()
+        self.assertStatisticsMatchRebuild()
+
+    def test_decisions(self):
+        decide(self.pending_approval(), ApprovalStatusChoices.APPROVED)
+        # Moving on to the next stage leaves the mission pending.
+        self.assertStatisticsMatchRebuild()
+        decide(self.pending_approval(), ApprovalStatusChoices.APPROVED)
+        self.assertStatisticsMatchRebuild()
+        self.assertEqual(MissionStatistic.objects.get().approved_count, 1)
+
+        rejected = MissionOrder.objects.create(**self.mission_data(self.manager, date(2024, 3, 10), date(2024, 3, 12)))
+        decide(Approval.objects.get(mission_order=rejected), ApprovalStatusChoices.REJECTED)
+        self.assertStatisticsMatchRebuild()
+        self.assertEqual(MissionStatistic.objects.get().rejected_count, 1)
+
+    def test_edit_after_decision(self):
+        mission = MissionOrder.objects.get(pk=self.mission.pk)
+        decide(self.pending_approval(), ApprovalStatusChoices.REJECTED)
+        # The instance loaded before the decision still holds the mission as pending.
+        mission.departure_date = date(2024, 5, 1)
+        mission.returning_date = date(2024, 5, 3)
+        mission.save()
+        self.assertStatisticsMatchRebuild()
+
+    def test_deletion(self):
+        MissionOrder.objects.get(pk=self.mission.pk).delete()
+        self.assertStatisticsMatchRebuild()
+
+    def test_bulk_creation(self):
+        missions = [MissionOrder(**self.mission_data(staff, date(2024, 3, 10), date(2024, 3, 12)))
+                    for staff in (self.manager, self.campus_manager)]
+        for mission in missions:
+            mission.compute_durations()
+        record_missions(MissionOrder.objects.bulk_create(missions))
+        self.assertStatisticsMatchRebuild()
+        self.assertEqual(MissionStatistic.objects.get().mission_count, 3)
+
+
+@override_settings(SMS_BACKEND='core.notifications.LocMemSMSBackend', NOTIFICATION_MAX_ATTEMPTS=3)
+class NotificationTests(MissionsTestCase):
+    def setUp(self):
+        super().setUp()
+        LocMemSMSBackend.outbox.clear()
+
+    def test_approval_request_is_queued_with_the_approval(self):
+        self.assertEqual(
+            set(Notification.objects.values_list('channel', 'recipient')),
+            {(NotificationChannelChoices.EMAIL, 'manager@ur.ac.rw'), (NotificationChannelChoices.SMS, '250788000001')},
+        )
+
+    def test_decision_rolls_back_with_its_notifications(self):
+        queued = Notification.objects.count()
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                decide(self.pending_approval(), ApprovalStatusChoices.APPROVED)
+        # Without its notifications the decision is not saved either.
+        self.assertEqual(self.pending_approval().stage, 1)
+        self.assertEqual(Notification.objects.count(), queued)
+
+        decide(self.pending_approval(), ApprovalStatusChoices.APPROVED)
+        self.assertEqual(Notification.objects.filter(recipient='campus.manager@ur.ac.rw').count(), 1)
+
+    def test_notifications_are_sent(self):
+        notifications = send_notifications()
+        self.assertEqual({notification.status for notification in notifications}, {NotificationStatusChoices.SENT})
+        self.assertEqual([message.to for message in mail.outbox], [['manager@ur.ac.rw']])
+        self.assertEqual([phone_number for phone_number, body in LocMemSMSBackend.outbox], ['250788000001'])
+        self.assertEqual(send_notifications(), [])
+
+    def test_claimed_notifications_are_leased(self):
+        first = Notification.objects.order_by('next_attempt_at').first()
+        [claimed] = claim_notifications(batch_size=1)
+        self.assertEqual(claimed, first)
+        claimed.refresh_from_db()
+        self.assertAlmostEqual(claimed.next_attempt_at, timezone.now() + NOTIFICATION_LEASE,
+                               delta=timedelta(seconds=5))
+        # Another worker only gets the rest, until the lease runs out.
+        self.assertNotIn(first, claim_notifications(batch_size=10))
+        Notification.objects.filter(pk=first.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(claim_notifications(batch_size=10), [first])
+
+    def test_failed_notifications_are_retried_with_backoff(self):
+        Notification.objects.filter(channel=NotificationChannelChoices.SMS).delete()
+        notification = Notification.objects.get()
+        with mock.patch('core.notifications.send_mail', side_effect=SMTPException('Connection refused')), \
+                self.assertLogs('core.notifications', 'WARNING'):
+            for attempt, backoff in enumerate((timedelta(minutes=1), timedelta(minutes=2)), start=1):
+                send_notifications()
+                notification.refresh_from_db()
+                self.assertEqual((notification.status, notification.attempts),
+                                 (NotificationStatusChoices.PENDING, attempt))
+                self.assertAlmostEqual(notification.next_attempt_at, timezone.now() + backoff,
+                                       delta=timedelta(seconds=5))
+                self.assertEqual(notification.last_error, 'Connection refused')
+                # Not due before the backoff runs out.
+                self.assertEqual(send_notifications(), [])
+                Notification.objects.filter(pk=notification.pk).update(next_attempt_at=timezone.now())
+
+            send_notifications()
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), (NotificationStatusChoices.FAILED, 3))
+        self.assertEqual(send_notifications(), [])
+
+
+class SearchTests(MissionsTestCase):
+    def test_staff_search(self):
+        self.assertEqual(list(search_staff(Staff.objects.all(), 'campus manager')), [self.campus_manager])
+        self.assertEqual(list(search_staff(Staff.objects.all(), '250788000003')), [self.staff])
+
+    def test_mission_search(self):
+        self.assertEqual(list(search_missions(MissionOrder.objects.all(), 'teaching')), [self.mission])
+        self.assertEqual(list(search_missions(MissionOrder.objects.all(), 'research')), [])
+
+    def test_blank_terms_match_nothing(self):
+        for terms in ('', '   '):
+            self.assertEqual(list(search_staff(Staff.objects.all(), terms)), [])
+            self.assertEqual(list(search_missions(MissionOrder.objects.all(), terms)), [])
+
+    def test_search_in_a_subquery(self):
+        # The subquery refers to core_staff by another alias.
+        best_match = search_staff(Staff.objects.all(), 'staff test')[:1]
+        self.assertEqual(list(MissionOrder.objects.filter(staff__in=best_match)), [self.mission])
+        best_match = search_missions(MissionOrder.objects.all(), 'teaching')[:1]
+        self.assertEqual(list(Staff.objects.filter(mission_orders__in=best_match)), [self.staff])
+
+
+class MissionCostTests(MissionsTestCase):
+    """Lecturers' rates: generic ones, with a longer distance band and a new version in July, and one for Huye."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for destination, min_distance_km, effective_date, daily, night, km in [
+            ('', 0, date(2024, 1, 1), 10, 5, 0),
+            ('', 100, date(2024, 1, 1), 20, 8, 1),
+            ('', 0, date(2024, 7, 1), 12, 6, 0),
+            ('HUYE', 0, date(2024, 3, 1), 15, 7, 0),
+        ]:
+            MissionRate.objects.create(role='LECTURER', destination=destination, min_distance_km=min_distance_km,
+                                       effective_date=effective_date, daily_allowance=daily, night_allowance=night,
+                                       km_allowance=km)
+
+    def test_find_rate(self):
+        index = get_rate_index()
+        for role, destination, distance_km, on, expected in [
+            ('LECTURER', 'RUSIZI', None, date(2024, 2, 1), (10, 5, 0)),
+            ('LECTURER', 'RUSIZI', 99, date(2024, 2, 1), (10, 5, 0)),
+            # Distance bands.
+            ('LECTURER', 'RUSIZI', 100, date(2024, 2, 1), (20, 8, 1)),
+            ('LECTURER', 'RUSIZI', 150, date(2024, 8, 1), (20, 8, 1)),
+            # Versions, from their effective date on.
+            ('LECTURER', 'RUSIZI', 50, date(2024, 6, 30), (10, 5, 0)),
+            ('LECTURER', 'RUSIZI', 50, date(2024, 7, 1), (12, 6, 0)),
+            ('LECTURER', 'RUSIZI', 50, date(2023, 12, 31), None),
+            # The destination's own rate, and the generic one before it applies.
+            ('LECTURER', 'HUYE', 50, date(2024, 3, 1), (15, 7, 0)),
+            ('LECTURER', 'HUYE', 150, date(2024, 8, 1), (15, 7, 0)),
+            ('LECTURER', 'HUYE', 50, date(2024, 2, 29), (10, 5, 0)),
+            ('PROFESSOR', 'HUYE', 50, date(2024, 3, 1), None),
+        ]:
+            with self.subTest(role=role, destination=destination, distance_km=distance_km, on=on):
+                rate = find_rate(index, role, destination, distance_km, on)
+                self.assertEqual(rate, expected and tuple(Decimal(allowance) for allowance in expected))
+
+    def test_price_missions(self):
+        missions, costs = zip(*[
+            (('LECTURER', 'RUSIZI', 120, date(2024, 6, 28), 3, 2), Decimal('196.00')),
+            (('LECTURER', 'RUSIZI', 10, date(2024, 7, 2), 2, 1), Decimal('30.00')),
+            (('LECTURER', 'HUYE', 10, date(2024, 3, 5), 2, 1), Decimal('37.00')),
+            (('LECTURER', 'HUYE', 10, date(2024, 3, 5), 1, 0), Decimal('15.00')),
+            (('PROFESSOR', 'HUYE', 10, date(2024, 3, 5), 2, 1), None),
+        ])
+        with self.assertNumQueries(0):
+            self.assertEqual(price_missions(missions, get_rate_index()), list(costs))
+
+    def test_rate_index_is_invalidated_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            MissionRate.objects.create(role='PROFESSOR', effective_date=date(2024, 1, 1), daily_allowance=30,
+                                       night_allowance=10)
+            # Until the rate commits, other requests still price with the committed rates.
+            self.assertIsNone(find_rate(get_rate_index(), 'PROFESSOR', 'HUYE', 10, date(2024, 3, 1)))
+        self.assertIsNotNone(find_rate(get_rate_index(), 'PROFESSOR', 'HUYE', 10, date(2024, 3, 1)))
+
+    def test_reprice_missions(self):
+        self.assertEqual(self.mission.cost, Decimal('59.00'))
+        # Five days to Rusizi, on the longer distance band, departing before the July rates.
+        other = MissionOrder.objects.create(**self.mission_data(
+            self.campus_manager, date(2024, 6, 28), date(2024, 7, 3), destination='RUSIZI', distance_km=120))
+        self.assertEqual(other.cost, Decimal('252.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # Rusizi gets its own rates after the fact: one in force at the departure, then one from the middle of
+            # the mission, which is priced at its departure.
+            MissionRate.objects.create(role='LECTURER', destination='RUSIZI', effective_date=date(2024, 6, 1),
+                                       daily_allowance=16, night_allowance=7)
+            MissionRate.objects.create(role='LECTURER', destination='RUSIZI', effective_date=date(2024, 6, 30),
+                                       daily_allowance=40, night_allowance=20)
+        stdout = io.StringIO()
+        call_command('reprice_missions', stdout=stdout)
+        self.assertIn('Repriced 1 missions', stdout.getvalue())
+        self.mission.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.mission.cost, other.cost), (Decimal('59.00'), Decimal('108.00')))
+
+        call_command('reprice_missions', stdout=stdout)
+        self.assertIn('Repriced 0 missions', stdout.getvalue())
@@ -0,0 +1,177 @@
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+READ_BLOCK_SIZE = 64 * 1024
+UPLOADS_DIR = 'uploads'
+ATTACHMENTS_DIR = 'mission_attachments'
+CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+# Leading bytes of the accepted file types, checked on the first chunk rather than trusting the declared type.
+CONTENT_TYPE_SIGNATURES = {
+    'application/pdf': (b'%PDF-',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'image/jpeg': (b'\xff\xd8\xff',),
+}
+
+
+class UploadOffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The chunk does not start where the upload stands, resume from its current offset.'
+    default_code = 'upload_offset_conflict'
+
+
+def part_name(session):
+    return f'{UPLOADS_DIR}/{session.pk}.part'
+
+
+def parse_content_range(header):
+    """Return the ``(start, end, total)`` of a ``Content-Range: bytes start-end/total`` header."""
+    match = CONTENT_RANGE_RE.fullmatch(header or '')
+    if not match:
+        raise ValidationError('Send each chunk with a Content-Range: bytes start-end/total header.')
+    start, end, total = (int(group) for group in match.groups())
+    if end < start:
+        raise ValidationError('The Content-Range ends before it starts.')
+    return start, end, total
+
+
+def validate_upload(content_type, size):
+    """Check the declared type and size of an upload against ATTACHMENT_CONTENT_TYPES and ATTACHMENT_MAX_SIZE."""
+    if content_type not in settings.ATTACHMENT_CONTENT_TYPES:
+        raise ValidationError({'content_type': f'Only {", ".join(settings.ATTACHMENT_CONTENT_TYPES)} are accepted.'})
+    if size > settings.ATTACHMENT_MAX_SIZE:
+        raise ValidationError({'size': f'Attachments cannot exceed {settings.ATTACHMENT_MAX_SIZE} bytes.'})
+
+
+def start_upload(mission_order, owner, filename, content_type, size):
+    from core.models import UploadSession
+
+    session = UploadSession.objects.create(mission_order=mission_order, owner=owner, filename=filename,
+                                           content_type=content_type, size=size)
+    path = default_storage.path(part_name(session))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+def receive_chunk(session, offset, stream, length):
+    """Read ``length`` bytes from ``stream`` into a file of their own, a block at a time, returning its path."""
+    path = default_storage.path(f'{UPLOADS_DIR}/{session.pk}.{uuid.uuid4()}.chunk')
+    received = 0
+    try:
+        with open(path, 'wb') as chunk:
+            while received < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - received))
+                if not block:
+                    break
+                if offset == 0 and received == 0 and not block.startswith(
+                        CONTENT_TYPE_SIGNATURES[session.content_type]):
+                    raise ValidationError(f'The file is not a valid {session.content_type} file.')
+                chunk.write(block)
+                received += len(block)
+        if received != length:
+            raise ValidationError('The chunk ended before its Content-Length.')
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset`` and complete the upload once every byte is in. Returns
+    the MissionAttachment when complete, else the session.
+
+    The chunk is received into a file of its own first, so the session is only locked to check the offset, append the
+    chunk to the part file and advance the offset, not while the client sends it. A chunk that fails half way leaves
+    the offset where it was; the client resumes by sending it again. Sending the last chunk again once every byte is
+    in retries the completion, should it have failed.
+    """
+    from core.models import UploadSession
+
+    if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise ValidationError(f'Chunks cannot exceed {settings.UPLOAD_CHUNK_MAX_SIZE} bytes.')
+    if session.offset == session.size:
+        return complete_upload(session)
+    if offset != session.offset:
+        raise UploadOffsetConflict()
+    if offset + length > session.size:
+        raise ValidationError(f'The upload was declared as {session.size} bytes.')
+    chunk_path = receive_chunk(session, offset, stream, length)
+    try:
+        with transaction.atomic():
+            # Locked so concurrent chunks of the same upload are appended one after the other.
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if offset != session.offset:
+                raise UploadOffsetConflict()
+            with open(default_storage.path(part_name(session)), 'r+b') as part, open(chunk_path, 'rb') as chunk:
+                part.seek(offset)
+                part.truncate()
+                shutil.copyfileobj(chunk, part, READ_BLOCK_SIZE)
+            session.offset = offset + length
+            session.save(update_fields=['offset', 'modified'])
+    finally:
+        os.remove(chunk_path)
+    if session.offset == session.size:
+        return complete_upload(session)
+    return session
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def complete_upload(session):
+    """
+    Link the received file under its content addressed name, unless an identical file is already stored there.
+
+    The part file stays until the session is deleted with the attachment's creation, so a failed completion can be
+    retried.
+    """
+    from core.models import MissionAttachment
+
+    path = default_storage.path(part_name(session))
+    sha256 = file_sha256(path)
+    name = f'{ATTACHMENTS_DIR}/{sha256[:2]}/{sha256}{mimetypes.guess_extension(session.content_type) or ""}'
+    if not default_storage.exists(name):
+        os.makedirs(os.path.dirname(default_storage.path(name)), exist_ok=True)
+        try:
+            os.link(path, default_storage.path(name))
+        except FileExistsError:
+            # Completed concurrently with an identical upload.
+            pass
+    with transaction.atomic():
+        attachment = MissionAttachment.objects.create(
+            mission_order_id=session.mission_order_id, attachment=name, original_name=session.filename,
+            content_type=session.content_type, size=session.size, sha256=sha256,
+        )
+        # Also removes the part file once committed, see core.models.
+        session.delete()
+    return attachment
+
+
+def remove_upload_part(session):
+    """Remove the part file of ``session`` once the transaction deleting it commits."""
+    path = default_storage.path(part_name(session))
+
+    def remove():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    transaction.on_commit(remove)
@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.fleet import release
+from core.notifications import approval_request_notifications, mission_decision_notifications
+from core.routing import get_next_approver_id
+from core.statistics import record_mission_status_change
+
+
+class TransitionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This approval has already been decided.'
+    default_code = 'transition_conflict'
+
+
+def next_stage_approver_id(approval):
+    """Return who approves after ``approval.approver``, or None when the mission is fully approved."""
+    next_approver_id = get_next_approver_id(approval.approver)
+    if next_approver_id is None or next_approver_id in approval.mission_order.approvals.values_list(
+            'approver_id', flat=True):
+        # Top of the hierarchy, or a routing loop back to someone who already approved.
+        return None
+    return next_approver_id
+
+
+@transaction.atomic
+def decide(approval, decision, comments=None, rejection_reason=None):
+    """
+    Approve or reject a pending ``approval`` and move its mission along: on approval to the next stage, with a new
+    approval for the next approver, or to its final status.
+
+    Every transition is a conditional UPDATE on the expected current state, never a read-modify-write, so of two
+    concurrent decisions exactly one wins; the other raises TransitionConflict and rolls back.
+    """
+    from core.models import Approval, ApprovalStatusChoices, MissionOrder, Notification
+
+    now = timezone.now()
+    fields = {'status': decision, 'approval_date': now, 'modified': now}
+    if comments is not None:
+        fields['comments'] = comments
+    if decision == ApprovalStatusChoices.REJECTED:
+        fields.update(rejected=True, rejection_reason=rejection_reason)
+    if not Approval.objects.filter(pk=approval.pk, status=ApprovalStatusChoices.PENDING).update(**fields):
+        raise TransitionConflict()
+    for name, value in fields.items():
+        setattr(approval, name, value)
+
+    mission = MissionOrder.objects.select_related('staff__user').get(pk=approval.mission_order_id)
+    approval.mission_order = mission
+    next_approver_id = None
+    if decision == ApprovalStatusChoices.APPROVED:
+        next_approver_id = next_stage_approver_id(approval)
+    if next_approver_id:
+        mission_fields = {'stage': approval.stage + 1, 'current_approver_id': next_approver_id}
+    else:
+        mission_fields = {'status': decision, 'current_approver_id': None}
+    current = MissionOrder.objects.filter(pk=mission.pk, status=ApprovalStatusChoices.PENDING, stage=approval.stage)
+    if not current.update(modified=now, **mission_fields):
+        raise TransitionConflict('This mission is no longer awaiting this approval.')
+    for name, value in mission_fields.items():
+        setattr(mission, name, value)
+
+    if next_approver_id:
+        next_approval = Approval.objects.create(mission_order=mission, approver_id=next_approver_id,
+                                                stage=approval.stage + 1)
+        notifications = approval_request_notifications([next_approval])
+    else:
+        # Saving with update() skipped the signals keeping the statistics up to date.
+        record_mission_status_change(mission, ApprovalStatusChoices.PENDING, decision)
+        mission.snapshot_statistics()
+        if decision == ApprovalStatusChoices.REJECTED:
+            # A rejected mission no longer needs its vehicle.
+            release([mission.transportation_id])
+        notifications = mission_decision_notifications(mission)
+    Notification.objects.bulk_create(notifications)
+    return approval
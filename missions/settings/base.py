@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'django_filters',
     'drf_yasg',
     'corsheaders',
 
@@ -64,6 +65,17 @@ TEMPLATES = [
 WSGI_APPLICATION = 'missions.wsgi.application'
 
 
+# Stored hashes made with any other hasher are upgraded to PASSWORD_HASHER on the next successful login.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'django.contrib.auth.hashers.PBKDF2PasswordHasher')
+
+PASSWORD_HASHERS = [PASSWORD_HASHER] + [hasher for hasher in [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+] if hasher != PASSWORD_HASHER]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -99,7 +111,7 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ),
     'EXCEPTION_HANDLER': 'utils.exception_handlers.custom_exception_handler',
 }
@@ -107,7 +119,50 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+}
+
+# Login password verifications: threads per process, logins allowed to wait for one, and how long they may wait.
+# The bounds only matter with workers serving requests concurrently, e.g. gunicorn's gthread workers.
+LOGIN_VERIFIER_WORKERS = int(os.environ.get('LOGIN_VERIFIER_WORKERS', 4))
+LOGIN_VERIFIER_MAX_PENDING = int(os.environ.get('LOGIN_VERIFIER_MAX_PENDING', 16))
+LOGIN_VERIFIER_TIMEOUT = 10
+
+# Login attempts allowed per (attempts, window in seconds).
+LOGIN_RATE_LIMITS = {
+    'ip': (100, 60),
+    'account': (10, 300),
 }
 
+# Networks of the reverse proxies whose X-Forwarded-For header tells the client address, see accounts.login.
+TRUSTED_PROXIES = []
+
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Local memory is private to each process, fine for development and tests only: the cached responses, group names,
+# approval routing, rate tables, token revocations and login rate limits are invalidated through this cache, so
+# production shares one between every worker and management command, see prod.py.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Cache holding the serialized colleges, campuses, units and departments.
+REFERENCE_DATA_CACHE_ALIAS = 'default'
+
+
+# Approval notifications, queued in the core.Notification outbox and sent by `manage.py send_notifications`.
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'missions@ur.ac.rw')
+SMS_BACKEND = os.environ.get('SMS_BACKEND', 'core.notifications.ConsoleSMSBackend')
+NOTIFICATION_MAX_ATTEMPTS = 5
+
+# Mission attachments, uploaded in chunks through core.uploads.
+ATTACHMENT_MAX_SIZE = 20 * 1024 * 1024
+ATTACHMENT_CONTENT_TYPES = ['application/pdf', 'image/png', 'image/jpeg']
+UPLOAD_CHUNK_MAX_SIZE = 5 * 1024 * 1024
+# Internal nginx location serving MEDIA_ROOT, see nginx/missions.conf; when unset, Django streams the files itself.
+ATTACHMENT_X_ACCEL_PREFIX = None
+# Unfinished uploads idle for longer are deleted by `manage.py flush_upload_sessions`.
+UPLOAD_SESSION_TIMEOUT = timedelta(days=1)
@@ -21,7 +21,8 @@ from django.urls import path, include, re_path
 from dotenv import load_dotenv
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
-from rest_framework_simplejwt.views import TokenObtainPairView
+
+from accounts.views import MissionsTokenObtainPairView, RotatingTokenRefreshView, LoginMetricsView
 
 load_dotenv()
 
@@ -40,8 +41,9 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenObtainPairView.as_view(), name='token_refresh'),
+    path('api/token/', MissionsTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', RotatingTokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/metrics/', LoginMetricsView.as_view(), name='token_metrics'),
     path('api/', include('api.urls')),
     path('api-auth/', include('rest_framework.urls')),
 
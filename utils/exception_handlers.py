@@ -6,12 +6,17 @@ def custom_exception_handler(exc, context):
     response = exception_handler(exc, context)
 
     if response is not None:
+        if isinstance(response.data, list):
+            # ValidationError raised outside of a serializer's validate().
+            response.data = {'non_field_errors': response.data}
         response.data['status_code'] = response.status_code
 
         if response.status_code == status.HTTP_404_NOT_FOUND:
             response.data['message'] = 'The requested resource was not found.'
         elif response.status_code == status.HTTP_400_BAD_REQUEST:
             response.data['message'] = 'There was an error with your request. Please check your input and try again.'
+        elif response.status_code == status.HTTP_409_CONFLICT:
+            response.data['message'] = 'Someone else changed this resource first. Please reload it and try again.'
         else:
             response.data['message'] = 'An unexpected error occurred.'
 
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+class RunVendorSQL(migrations.RunSQL):
+    """
+    RunSQL applied only on one database backend, ``vendor`` being a connection vendor such as 'postgresql' or
+    'sqlite'. Migrations keep their own copy of the SQL, so later changes to the application code cannot change
+    what an old migration does.
+    """
+
+    def __init__(self, vendor, sql, reverse_sql=None, **kwargs):
+        self.vendor = vendor
+        super().__init__(sql, reverse_sql, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        kwargs['vendor'] = self.vendor
+        return name, args, kwargs
+
+    def describe(self):
+        return f'Raw SQL operation on {self.vendor}'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)